@@ -3,14 +3,29 @@ Script Simple para Probar el Sistema de Detección
 Usa el modelo ya entrenado en models/best.pt
 """
 
+import argparse
 import cv2
 from ultralytics import YOLO
 import pyttsx3
-import threading
+import time
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from cola_voz import ColaVoz
+from resolucion_dinamica import ControladorResolucion
 
 class DetectorSimple:
-    def __init__(self, model_path='models/best.pt'):
+    def __init__(self, model_path='models/best.pt', controlador_resolucion=None):
+        """
+        Args:
+            model_path: Ruta al modelo YOLO
+            controlador_resolucion: ControladorResolucion de
+                                    src/resolucion_dinamica.py (opcional)
+        """
         print("🚀 Cargando modelo YOLO...")
+        self.controlador_resolucion = controlador_resolucion
         try:
             self.model = YOLO(model_path)
             print("✅ Modelo cargado correctamente")
@@ -19,28 +34,26 @@ class DetectorSimple:
             # Sistema de voz
             self.engine = pyttsx3.init()
             self.engine.setProperty('rate', 150)
+            self.voz = ColaVoz(self.engine)
             print("✅ Sistema de voz inicializado")
             
         except Exception as e:
             print(f"❌ Error al cargar el modelo: {e}")
             raise
     
-    def notificar_voz(self, mensaje):
-        """Notifica mediante voz en hilo separado"""
-        def speak():
-            try:
-                self.engine.say(mensaje)
-                self.engine.runAndWait()
-            except:
-                pass
-        
-        thread = threading.Thread(target=speak)
-        thread.daemon = True
-        thread.start()
+    def notificar_voz(self, mensaje, prioritario=False):
+        """Notifica mediante el hilo de voz (prioritario interrumpe el mensaje en curso)"""
+        self.voz.decir(mensaje, prioritario)
     
-    def ejecutar(self, camera_id=0):
+    def ejecutar(self, camera_id=0, camera_derecha_id=None):
         """
         Ejecuta detección en tiempo real
+        
+        Args:
+            camera_id: ID de la cámara principal
+            camera_derecha_id: ID de una segunda cámara (opcional); si se
+                               indica, la alarma de obstáculos por
+                               profundidad corre en cada frame
         """
         print(f"\n🎥 Abriendo cámara {camera_id}...")
         cap = cv2.VideoCapture(camera_id)
@@ -50,6 +63,18 @@ class DetectorSimple:
             print("💡 Verifica que tienes una cámara conectada")
             return
         
+        cap_derecha = None
+        alarma = None
+        if camera_derecha_id is not None:
+            from alarma_obstaculos import AlarmaObstaculos, mensaje_alerta, dibujar_alerta
+            
+            cap_derecha = cv2.VideoCapture(camera_derecha_id)
+            if cap_derecha.isOpened():
+                alarma = AlarmaObstaculos()
+                print(f"✅ Alarma de obstáculos activa (cámara derecha {camera_derecha_id})")
+            else:
+                print("⚠️  No se pudo abrir la cámara derecha, alarma desactivada")
+        
         print("✅ Cámara activa")
         print("\n📌 CONTROLES:")
         print("   - Presiona 'q' para SALIR")
@@ -60,6 +85,7 @@ class DetectorSimple:
         frame_count = 0
         voz_activa = True
         objetos_notificados = set()
+        cajas_conocidas = []
         
         while True:
             ret, frame = cap.read()
@@ -67,13 +93,39 @@ class DetectorSimple:
                 print("❌ Error al capturar frame")
                 break
             
+            # Alarma por profundidad en cada frame, también entre inferencias
+            alerta = None
+            if alarma is not None:
+                ret_derecha, frame_derecha = cap_derecha.read()
+                if ret_derecha:
+                    alerta = alarma.analizar(frame, frame_derecha, cajas_conocidas)
+                    if alerta is not None and voz_activa:
+                        self.notificar_voz(mensaje_alerta(alerta), prioritario=True)
+            
             # Hacer detección cada 5 frames (mejor rendimiento)
             if frame_count % 5 == 0:
-                results = self.model(frame, verbose=False, conf=0.5)
+                if self.controlador_resolucion is not None:
+                    inicio = time.perf_counter()
+                    results = self.model(frame, verbose=False, conf=0.5,
+                                         imgsz=self.controlador_resolucion.imgsz)
+                    latencia_ms = (time.perf_counter() - inicio) * 1000
+                    
+                    registros = [
+                        {'clase': self.model.names[int(box.cls[0])],
+                         'bbox': tuple(map(int, box.xyxy[0]))}
+                        for box in results[0].boxes
+                    ]
+                    self.controlador_resolucion.registrar(
+                        latencia_ms, registros, frame.shape[:2]
+                    )
+                else:
+                    results = self.model(frame, verbose=False, conf=0.5)
                 
                 # Procesar resultados
                 annotated_frame = results[0].plot()
                 
+                cajas_conocidas = [tuple(map(int, box.xyxy[0])) for box in results[0].boxes]
+                
                 # Contar detecciones
                 detecciones = {}
                 for box in results[0].boxes:
@@ -111,6 +163,9 @@ class DetectorSimple:
             else:
                 annotated_frame = frame
             
+            if alerta is not None:
+                annotated_frame = dibujar_alerta(annotated_frame.copy(), alerta)
+            
             # Mostrar frame
             cv2.imshow('Sistema de Deteccion - Asistencia Visual', annotated_frame)
             
@@ -132,11 +187,22 @@ class DetectorSimple:
         
         # Limpiar
         cap.release()
+        if cap_derecha is not None:
+            cap_derecha.release()
         cv2.destroyAllWindows()
         print("✅ Sistema cerrado correctamente")
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description="Detección simple con una cámara")
+    parser.add_argument("--camara", type=int, default=0, help="ID de la cámara principal")
+    parser.add_argument("--derecha", type=int, default=None,
+                        help="ID de la cámara derecha: activa la alarma de obstáculos")
+    parser.add_argument("--latencia-objetivo", type=float, default=100,
+                        help="Latencia de inferencia (ms) para ajustar el imgsz "
+                             "(0 = resolución fija)")
+    args = parser.parse_args()
+    
     print("="*60)
     print("  SISTEMA DE ASISTENCIA VISUAL PARA PERSONAS")
     print("  CON DISCAPACIDAD VISUAL")
@@ -144,11 +210,16 @@ def main():
     print()
     
     try:
+        # Resolución dinámica (mismo objetivo por defecto que detect.py)
+        controlador = None
+        if args.latencia_objetivo > 0:
+            controlador = ControladorResolucion(latencia_objetivo_ms=args.latencia_objetivo)
+        
         # Crear detector (usando modelo base YOLOv8s)
-        detector = DetectorSimple(model_path='yolov8s.pt')
+        detector = DetectorSimple(model_path='yolov8s.pt', controlador_resolucion=controlador)
         
         # Ejecutar
-        detector.ejecutar(camera_id=0)
+        detector.ejecutar(camera_id=args.camara, camera_derecha_id=args.derecha)
         
     except FileNotFoundError:
         print("\n❌ ERROR: No se encontró el modelo 'models/best.pt'")
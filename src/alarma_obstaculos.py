@@ -0,0 +1,226 @@
+"""
+Alarma de Obstáculos Cercanos por Profundidad
+
+Ruta de seguridad que no depende de que YOLO reconozca el objeto:
+1. En cada frame recorta la franja del corredor frente al usuario y la
+   reduce de escala
+2. Calcula una disparidad barata (StereoBM) solo sobre esa franja
+3. Busca la mancha cercana más grande (componentes conexas); si es grande,
+   está cerca y no coincide con una detección conocida, alerta
+4. Mide su propio tiempo y reduce la escala si supera el presupuesto
+   por frame
+
+Con un BuffersFrame (memoria.py) los arrays intermedios se reutilizan
+entre frames.
+"""
+
+import math
+import time
+
+import cv2
+import numpy as np
+
+from localizacion3d import FRASES_DIRECCION
+
+class AlarmaObstaculos:
+    """
+    Detecta obstáculos cercanos no clasificados a partir del par estéreo
+    """
+
+    def __init__(
+        self,
+        focal_length=700,
+        baseline=0.06,
+        distancia_alerta=1.2,
+        distancia_minima=0.3,
+        escala=0.25,
+        escala_minima=0.125,
+        corredor=(0.25, 0.75, 0.3, 1.0),
+        fraccion_minima=0.04,
+        frames_confirmacion=2,
+        cooldown=1.5,
+        presupuesto_ms=8.0
+    ):
+        """
+        Args:
+            focal_length: Distancia focal (píxeles, resolución completa)
+            baseline: Separación entre cámaras (metros)
+            distancia_alerta: Distancia (m) por debajo de la cual se alerta
+            distancia_minima: Distancia más cercana que debe poder medirse
+            escala: Factor de reducción inicial de la franja
+            escala_minima: Límite de reducción al ajustarse al presupuesto
+            corredor: (x0, x1, y0, y1) del corredor en fracciones del frame
+            fraccion_minima: Fracción del corredor que debe ocupar la mancha
+            frames_confirmacion: Frames seguidos necesarios para alertar
+            cooldown: Segundos mínimos entre alertas
+            presupuesto_ms: Tiempo máximo por frame para el análisis
+        """
+        self.focal_length = focal_length
+        self.baseline = baseline
+        self.distancia_alerta = distancia_alerta
+        self.distancia_minima = distancia_minima
+        self.escala_inicial = escala
+        self.escala = escala
+        self.escala_minima = escala_minima
+        self.corredor = corredor
+        self.fraccion_minima = fraccion_minima
+        self.frames_confirmacion = frames_confirmacion
+        self.cooldown = cooldown
+        self.presupuesto_ms = presupuesto_ms
+
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        self._stereo = {}
+        self._consecutivos = 0
+        self._ultima_alerta = 0.0
+        self._frames_holgados = 0
+
+        self.ultimo_tiempo_ms = 0.0
+
+    def _stereo_para(self, escala):
+        """StereoBM con disparidades suficientes para distancia_minima"""
+        if escala not in self._stereo:
+            d_max = self.focal_length * escala * self.baseline / self.distancia_minima
+            num_disparidades = max(16, int(math.ceil(d_max / 16)) * 16)
+            self._stereo[escala] = (
+                cv2.StereoBM_create(numDisparities=num_disparidades, blockSize=9),
+                num_disparidades,
+            )
+        return self._stereo[escala]
+
+    def _ajustar_escala(self, tiempo_ms):
+        """Reduce la escala si se pasa del presupuesto y la recupera con holgura"""
+        if tiempo_ms > self.presupuesto_ms and self.escala > self.escala_minima:
+            self.escala = max(self.escala_minima, self.escala * 0.75)
+            self._frames_holgados = 0
+            print(f"⏱️  Alarma: {tiempo_ms:.1f} ms > {self.presupuesto_ms} ms, "
+                  f"escala reducida a {self.escala:.3f}")
+        elif tiempo_ms < self.presupuesto_ms * 0.4 and self.escala < self.escala_inicial:
+            self._frames_holgados += 1
+            if self._frames_holgados >= 30:
+                self.escala = min(self.escala_inicial, self.escala / 0.75)
+                self._frames_holgados = 0
+        else:
+            self._frames_holgados = 0
+
+    def analizar(self, frame_left, frame_right, cajas_conocidas=(), buffers=None):
+        """
+        Analiza el corredor de un par estéreo
+
+        Args:
+            frame_left, frame_right: Frames BGR a resolución completa
+            cajas_conocidas: Cajas (x1, y1, x2, y2) ya clasificadas por YOLO;
+                             las manchas cuyo centro cae dentro se ignoran
+            buffers: BuffersFrame para reutilizar los arrays intermedios
+                     (opcional)
+
+        Returns:
+            dict con 'distancia', 'direccion', 'fraccion' y 'tiempo_ms'
+            cuando hay que alertar; None en caso contrario
+        """
+        inicio = time.perf_counter()
+        alerta = self._detectar(frame_left, frame_right, cajas_conocidas, buffers)
+
+        self.ultimo_tiempo_ms = (time.perf_counter() - inicio) * 1000
+        self._ajustar_escala(self.ultimo_tiempo_ms)
+
+        if alerta is None:
+            self._consecutivos = 0
+            return None
+
+        self._consecutivos += 1
+        ahora = time.time()
+        if (self._consecutivos < self.frames_confirmacion
+                or ahora - self._ultima_alerta < self.cooldown):
+            return None
+
+        self._ultima_alerta = ahora
+        alerta['tiempo_ms'] = self.ultimo_tiempo_ms
+        return alerta
+
+    def _detectar(self, frame_left, frame_right, cajas_conocidas, buffers=None):
+        # Sin pool, dst=None hace que OpenCV reserve arrays nuevos
+        buffer = buffers.obtener if buffers is not None else lambda *args: None
+
+        alto, ancho = frame_left.shape[:2]
+        x0, x1, y0, y1 = self.corredor
+        fila0, fila1 = int(alto * y0), int(alto * y1)
+
+        # Franja completa en ancho (StereoBM necesita margen a la izquierda)
+        escala = self.escala
+        stereo, num_disparidades = self._stereo_para(escala)
+        forma_franja = (fila1 - fila0, ancho)
+        forma = (max(1, round(forma_franja[0] * escala)), max(1, round(ancho * escala)))
+        gris = []
+        for lado, frame in (('izq', frame_left), ('der', frame_right)):
+            franja = cv2.cvtColor(frame[fila0:fila1], cv2.COLOR_BGR2GRAY,
+                                  dst=buffer(f'alarma_franja_{lado}', forma_franja))
+            gris.append(cv2.resize(franja, (forma[1], forma[0]),
+                                   dst=buffer(f'alarma_gris_{lado}', forma),
+                                   interpolation=cv2.INTER_AREA))
+
+        disparidad = stereo.compute(  # int16, × 16
+            gris[0], gris[1], disparity=buffer('alarma_disparidad', forma, np.int16)
+        )
+
+        # Corredor en coordenadas reducidas
+        col0 = max(int(ancho * x0 * escala), num_disparidades)
+        col1 = int(ancho * x1 * escala)
+        if col1 <= col0:
+            return None
+        corredor = disparidad[:, col0:col1]
+
+        umbral = 16 * self.focal_length * escala * self.baseline / self.distancia_alerta
+        forma_corredor = corredor.shape
+        cercano = np.greater_equal(
+            corredor, umbral, out=buffer('alarma_cercano', forma_corredor, np.bool_)
+        ).view(np.uint8)
+        cercano = cv2.morphologyEx(cercano, cv2.MORPH_OPEN, self._kernel,
+                                   dst=buffer('alarma_abierto', forma_corredor))
+
+        n, etiquetas, stats, centroides = cv2.connectedComponentsWithStats(
+            cercano, labels=buffer('alarma_etiquetas', forma_corredor, np.int32), connectivity=8
+        )
+        if n <= 1:
+            return None
+
+        area_corredor = corredor.shape[0] * corredor.shape[1]
+        for i in np.argsort(-stats[1:, cv2.CC_STAT_AREA]) + 1:
+            fraccion = stats[i, cv2.CC_STAT_AREA] / area_corredor
+            if fraccion < self.fraccion_minima:
+                return None
+
+            # Centro de la mancha en coordenadas del frame completo
+            cx = (centroides[i][0] + col0) / escala
+            cy = centroides[i][1] / escala + fila0
+            if any(bx1 <= cx <= bx2 and by1 <= cy <= by2
+                   for bx1, by1, bx2, by2 in cajas_conocidas):
+                continue
+
+            d_mediana = np.median(corredor[etiquetas == i]) / 16
+            distancia = self.focal_length * escala * self.baseline / d_mediana
+
+            tercio = (cx / ancho - x0) / (x1 - x0)
+            direccion = 'izquierda' if tercio < 1 / 3 else 'derecha' if tercio > 2 / 3 else 'centro'
+
+            return {
+                'distancia': float(distancia),
+                'direccion': direccion,
+                'fraccion': float(fraccion),
+                'centro': (float(cx), float(cy)),
+            }
+
+        return None
+
+def mensaje_alerta(alerta):
+    """Texto de la alerta de voz"""
+    return (f"Cuidado, obstáculo a {alerta['distancia']:.1f} metros "
+            f"{FRASES_DIRECCION[alerta['direccion']]}")
+
+def dibujar_alerta(frame, alerta):
+    """Dibuja el aviso de obstáculo sobre el frame"""
+    cv2.rectangle(frame, (0, 0), (frame.shape[1], 40), (0, 0, 255), -1)
+    cv2.putText(frame, f"OBSTACULO {alerta['distancia']:.1f}m {alerta['direccion'].upper()}",
+                (10, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    cx, cy = map(int, alerta['centro'])
+    cv2.circle(frame, (cx, cy), 12, (0, 0, 255), 3)
+    return frame
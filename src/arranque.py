@@ -0,0 +1,134 @@
+"""
+Arranque Rápido del Sistema de Visión Estéreo
+
+Reduce el tiempo hasta la primera detección:
+1. Carga del modelo YOLO, motor de voz y apertura de cámaras en paralelo
+2. Importaciones pesadas (ultralytics/PyTorch, pyttsx3) solo al necesitarse
+3. Una inferencia de calentamiento tras cargar el modelo, en paralelo con
+   la apertura de cámaras y la voz (la primera detección real no paga la
+   inicialización del predictor)
+4. Línea de tiempo del arranque para medir el time-to-first-detection
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from detect import SistemaVisionEstereo, cargar_modelo, crear_motor_voz
+
+class LineaDeTiempo:
+    """
+    Registra los eventos del arranque con su instante relativo al inicio
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.eventos = []
+        self._lock = threading.Lock()
+
+    def marcar(self, evento):
+        """Registra un evento (seguro desde varios hilos)"""
+        instante = time.perf_counter() - self.inicio
+        with self._lock:
+            self.eventos.append((evento, instante))
+        return instante
+
+    def como_dict(self):
+        """Eventos en milisegundos desde el inicio"""
+        with self._lock:
+            return {evento: instante * 1000 for evento, instante in self.eventos}
+
+    def reporte(self):
+        """Imprime la línea de tiempo ordenada"""
+        with self._lock:
+            eventos = sorted(self.eventos, key=lambda e: e[1])
+
+        print(f"\n⏱️  Línea de tiempo de arranque:")
+        for evento, instante in eventos:
+            print(f"   {instante*1000:8.1f} ms  {evento}")
+
+def _cargar_y_calentar(model_path, linea, calentamientos, forma_frame):
+    """
+    Carga el modelo y ejecuta inferencias de calentamiento
+
+    El calentamiento corre en el mismo hilo de carga, en paralelo con la
+    apertura de cámaras, para que la primera inferencia real ya no pague
+    la inicialización perezosa de PyTorch ni del predictor. arranque_rapido
+    espera a que termine (el predictor de YOLO no admite dos inferencias a
+    la vez), así que cada calentamiento extra que no quepa en el tiempo de
+    apertura de las cámaras retrasa la primera detección.
+    """
+    model = cargar_modelo(model_path)
+    linea.marcar('modelo_cargado')
+
+    frame = np.zeros(forma_frame, dtype=np.uint8)
+    for _ in range(calentamientos):
+        model(frame, verbose=False)
+    linea.marcar('modelo_calentado')
+
+    return model
+
+def _iniciar_voz(linea):
+    engine = crear_motor_voz()
+    linea.marcar('voz_inicializada')
+    return engine
+
+def _abrir_camara(cam_id, linea, nombre):
+    cap = cv2.VideoCapture(cam_id)
+    linea.marcar(f'camara_{nombre}_abierta')
+    return cap
+
+def arranque_rapido(
+    model_path,
+    cam_left_id=0,
+    cam_right_id=1,
+    focal_length=700,
+    baseline=0.06,
+    calentamientos=1,
+    forma_frame=(480, 640, 3),
+    controlador_resolucion=None
+):
+    """
+    Inicializa modelo, voz y cámaras en paralelo
+
+    Args:
+        model_path: Ruta al modelo YOLO entrenado
+        cam_left_id: ID de cámara izquierda
+        cam_right_id: ID de cámara derecha
+        focal_length: Distancia focal (píxeles)
+        baseline: Separación entre cámaras (metros)
+        calentamientos: Inferencias de calentamiento tras cargar el modelo
+                        (una basta para inicializar el predictor)
+        forma_frame: Forma de las imágenes de calentamiento (alto, ancho, 3)
+        controlador_resolucion: ControladorResolucion para el sistema (opcional)
+
+    Returns:
+        tuple: (sistema, (cap_left, cap_right), linea_tiempo)
+    """
+    linea = LineaDeTiempo()
+    print("🚀 Arranque rápido: modelo, voz y cámaras en paralelo...")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        f_model = pool.submit(_cargar_y_calentar, model_path, linea, calentamientos, forma_frame)
+        f_voz = pool.submit(_iniciar_voz, linea)
+        f_left = pool.submit(_abrir_camara, cam_left_id, linea, 'izquierda')
+        f_right = pool.submit(_abrir_camara, cam_right_id, linea, 'derecha')
+
+        caps = (f_left.result(), f_right.result())
+        engine = f_voz.result()
+        model = f_model.result()
+
+    sistema = SistemaVisionEstereo(
+        model_path=model_path,
+        focal_length=focal_length,
+        baseline=baseline,
+        model=model,
+        engine=engine,
+        controlador_resolucion=controlador_resolucion
+    )
+    linea.marcar('sistema_listo')
+
+    return sistema, caps, linea
@@ -0,0 +1,78 @@
+"""
+Cola de Síntesis de Voz con Prioridad
+
+pyttsx3 no admite dos runAndWait a la vez ("run loop already started"),
+así que todos los mensajes pasan por un único hilo que es el único que
+usa el motor:
+1. Los mensajes se etiquetan con su origen (p. ej. el flujo en
+   multi_flujo.py)
+2. Las alertas prioritarias se dicen antes que los mensajes normales,
+   descartan los normales aún pendientes del mismo origen e interrumpen
+   (engine.stop) un mensaje normal que se esté diciendo
+"""
+
+import itertools
+import queue
+import threading
+
+class ColaVoz:
+    """
+    Hilo único de síntesis de voz con carril prioritario
+    """
+
+    def __init__(self, engine):
+        """
+        Args:
+            engine: Motor pyttsx3 ya inicializado (solo lo usa el hilo de voz)
+        """
+        self.engine = engine
+        self._cola = queue.PriorityQueue()
+        self._orden = itertools.count()
+        self._lock = threading.Lock()
+        self._descartar_hasta = {}   # origen -> orden de su última alerta
+        self._diciendo = None        # prioridad del mensaje en curso
+
+        threading.Thread(target=self._bucle, daemon=True).start()
+
+    def decir(self, mensaje, prioritario=False, origen=None):
+        """
+        Encola un mensaje (no bloquea)
+
+        Args:
+            mensaje: Texto a decir
+            prioritario: Alerta que interrumpe el mensaje normal en curso
+            origen: Etiqueta de quien lo envía
+        """
+        with self._lock:
+            orden = next(self._orden)
+            if prioritario:
+                self._descartar_hasta[origen] = orden
+            interrumpir = prioritario and self._diciendo == 1
+        self._cola.put((0 if prioritario else 1, orden, origen, mensaje))
+
+        # stop() hace que el runAndWait del hilo de voz termine; la alerta
+        # es lo siguiente que sale de la cola
+        if interrumpir:
+            try:
+                self.engine.stop()
+            except RuntimeError as e:
+                print(f"⚠️  Error al interrumpir la voz: {e}")
+
+    def _bucle(self):
+        while True:
+            prioridad, orden, origen, mensaje = self._cola.get()
+            with self._lock:
+                if prioridad == 1 and orden < self._descartar_hasta.get(origen, -1):
+                    continue
+                self._diciendo = prioridad
+
+            etiqueta = f"[{origen}] " if origen is not None else ""
+            print(f"🔊 {etiqueta}{mensaje}")
+            try:
+                self.engine.say(mensaje)
+                self.engine.runAndWait()
+            except RuntimeError as e:
+                print(f"⚠️  {etiqueta}Error de voz: {e}")
+            finally:
+                with self._lock:
+                    self._diciendo = None
@@ -0,0 +1,180 @@
+"""
+Pérdida y Entrenador de Destilación (maestro -> alumno)
+
+Clases usadas por `python train.py destilar`. Están definidas a nivel de
+módulo para que el checkpoint del alumno se pueda serializar: ultralytics
+guarda el modelo con torch.save, que no admite funciones locales.
+
+Requiere la salida de la cabeza Detect de ultralytics 8.0–8.3 (lista de
+mapas por escala); a partir de 8.4 la cabeza devuelve un dict y la
+destilación se detiene con un error explícito.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from ultralytics.cfg import DEFAULT_CFG
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils.loss import v8DetectionLoss
+
+def mapas_cabeza(salida):
+    """
+    Mapas [B, no, H, W] por escala de la cabeza Detect
+
+    En evaluación la cabeza devuelve (predicciones, mapas) y en
+    entrenamiento solo los mapas.
+    """
+    if isinstance(salida, dict):
+        raise RuntimeError(
+            "La cabeza de detección devolvió un dict (ultralytics >= 8.4); "
+            "la destilación solo admite ultralytics 8.0–8.3 (ver requirements.txt)"
+        )
+    return salida[1] if isinstance(salida, tuple) else salida
+
+class PerdidaDestilacion(v8DetectionLoss):
+    """
+    Pérdida de YOLOv8 más `peso` × (KD de clases + KD de cajas)
+
+    - KD de clases: BCE entre logits del alumno y probabilidades
+      suavizadas (temperatura) del maestro
+    - KD de cajas: KL entre las distribuciones DFL de alumno y maestro
+
+    Ambas se ponderan por la confianza del maestro en cada ancla, para
+    centrarse en los objetos y no en el fondo. Si un lote no tiene caché
+    o las anclas no coinciden, la KD vale 0; esos lotes se cuentan en
+    `lotes_sin_kd` (con el motivo) y se avisa la primera vez.
+    """
+
+    def __init__(self, model, cache_dir, peso=1.0, temperatura=2.0):
+        super().__init__(model)
+        self.cache_dir = Path(cache_dir)
+        self.peso = peso
+        self.temperatura = temperatura
+
+        self.lotes_con_kd = 0
+        self.lotes_sin_kd = {}   # motivo -> lotes
+
+    def _omitir(self, motivo, detalle):
+        if motivo not in self.lotes_sin_kd:
+            print(f"⚠️  Lote sin destilación ({motivo}): {detalle}")
+        self.lotes_sin_kd[motivo] = self.lotes_sin_kd.get(motivo, 0) + 1
+
+    def _cargar_maestro(self, archivos, anclas):
+        preds = []
+        for archivo in archivos:
+            ruta = self.cache_dir / f"{Path(archivo).stem}.npy"
+            if not ruta.exists():
+                self._omitir('sin_cache', ruta)
+                return None
+            pred = np.load(ruta)
+            if pred.shape != (self.no, anclas):
+                self._omitir('forma_distinta',
+                             f"{ruta} tiene {pred.shape}, el alumno {(self.no, anclas)}")
+                return None
+            preds.append(pred)
+        self.lotes_con_kd += 1
+        return torch.from_numpy(np.stack(preds)).to(self.device).float()
+
+    def resumen(self):
+        omitidos = sum(self.lotes_sin_kd.values())
+        total = self.lotes_con_kd + omitidos
+        return {
+            'lotes_con_kd': self.lotes_con_kd,
+            'lotes_sin_kd': omitidos,
+            'motivos_sin_kd': dict(self.lotes_sin_kd),
+            'fraccion_con_kd': self.lotes_con_kd / total if total else 0.0,
+        }
+
+    def __call__(self, preds, batch):
+        total, items = super().__call__(preds, batch)
+
+        feats = mapas_cabeza(preds)
+        b = feats[0].shape[0]
+        alumno = torch.cat([xi.view(b, self.no, -1) for xi in feats], 2).float()
+        maestro = self._cargar_maestro(batch['im_file'], alumno.shape[2])
+
+        if maestro is None:
+            kd = torch.zeros((), device=self.device)
+        else:
+            t = self.temperatura
+            n_box = self.reg_max * 4
+
+            # Peso por ancla: confianza máxima del maestro
+            pesos = maestro[:, n_box:].sigmoid().amax(1)  # [B, anclas]
+            pesos = pesos / pesos.sum().clamp(min=1e-6)
+
+            kd_cls = F.binary_cross_entropy_with_logits(
+                alumno[:, n_box:] / t, (maestro[:, n_box:] / t).sigmoid(), reduction='none'
+            ).sum(1)
+
+            dist_alumno = alumno[:, :n_box].view(b, 4, self.reg_max, -1)
+            dist_maestro = maestro[:, :n_box].view(b, 4, self.reg_max, -1)
+            kd_box = F.kl_div(
+                F.log_softmax(dist_alumno / t, dim=2),
+                F.softmax(dist_maestro / t, dim=2),
+                reduction='none'
+            ).sum((1, 2))
+
+            kd = ((kd_cls + kd_box) * pesos).sum() * t * t * self.peso
+
+        if total.dim() == 0:
+            total = total + kd * b
+        else:
+            total = torch.cat([total, (kd * b).view(1)])
+        return total, torch.cat([items, kd.detach().view(1)])
+
+class EntrenadorDestilacion(DetectionTrainer):
+    """
+    DetectionTrainer cuyo modelo en entrenamiento usa PerdidaDestilacion
+
+    La pérdida se asigna a `model.criterion` después de crear la EMA, así
+    que la EMA (de la que salen best.pt y last.pt) y el validador conservan
+    la pérdida estándar. Se construye con functools.partial para pasar la
+    caché: model.train(trainer=partial(EntrenadorDestilacion, cache_dir=...)).
+
+    Al terminar escribe en la carpeta del experimento
+    `cobertura_destilacion.json` con los lotes que tuvieron (o no) KD.
+    """
+
+    def __init__(self, cfg=DEFAULT_CFG, overrides=None, _callbacks=None,
+                 cache_dir=None, peso=1.0, temperatura=2.0):
+        super().__init__(cfg, overrides, _callbacks)
+        self.cache_dir = cache_dir
+        self.peso = peso
+        self.temperatura = temperatura
+        self.add_callback('on_train_end', _guardar_cobertura)
+
+    def _setup_train(self, *args, **kwargs):
+        super()._setup_train(*args, **kwargs)
+        self.model.criterion = PerdidaDestilacion(
+            self.model, self.cache_dir, self.peso, self.temperatura
+        )
+
+    def save_model(self):
+        # Versiones que guardan también self.model: sin la pérdida del alumno
+        criterion, self.model.criterion = self.model.criterion, None
+        try:
+            super().save_model()
+        finally:
+            self.model.criterion = criterion
+
+    def get_validator(self):
+        validator = super().get_validator()
+        self.loss_names = (*self.loss_names, 'kd_loss')
+        return validator
+
+def _guardar_cobertura(trainer):
+    criterion = getattr(trainer.model, 'criterion', None)
+    if not isinstance(criterion, PerdidaDestilacion):
+        return
+    cobertura = criterion.resumen()
+    (Path(trainer.save_dir) / 'cobertura_destilacion.json').write_text(
+        json.dumps(cobertura, indent=2)
+    )
+    if cobertura['lotes_sin_kd']:
+        print(f"⚠️  Destilación aplicada en {cobertura['lotes_con_kd']} de "
+              f"{cobertura['lotes_con_kd'] + cobertura['lotes_sin_kd']} lotes "
+              f"({cobertura['motivos_sin_kd']})")
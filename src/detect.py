@@ -11,38 +11,84 @@ Este módulo implementa:
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
-import pyttsx3
-import threading
+import sys
+import time
 from datetime import datetime
 
+from localizacion3d import Localizador3D, FRASES_DIRECCION
+from alarma_obstaculos import AlarmaObstaculos, mensaje_alerta, dibujar_alerta
+from memoria import BuffersFrame, MonitorMemoria
+from cola_voz import ColaVoz
+
+# ultralytics (PyTorch) y pyttsx3 se importan solo cuando se necesitan,
+# para que arranque.py pueda cargarlos en paralelo con las cámaras
+
+def cargar_modelo(model_path):
+    """
+    Carga el modelo YOLO entrenado
+    """
+    from ultralytics import YOLO
+    
+    return YOLO(model_path)
+
+def crear_motor_voz():
+    """
+    Inicializa el motor de síntesis de voz
+    """
+    import pyttsx3
+    
+    engine = pyttsx3.init()
+    engine.setProperty('rate', 150)
+    engine.setProperty('volume', 1.0)
+    return engine
+
 class SistemaVisionEstereo:
     """
     Sistema completo de detección y medición de distancia
     usando 2 cámaras (visión estéreo)
     """
     
-    def __init__(self, model_path, focal_length=700, baseline=0.06):
+    def __init__(self, model_path, focal_length=700, baseline=0.06, model=None, engine=None, voz=True,
+                 controlador_resolucion=None, alarma=True):
         """
         Args:
             model_path: Ruta al modelo YOLO entrenado
             focal_length: Distancia focal de las cámaras (en píxeles)
             baseline: Separación entre cámaras (en metros) - típicamente 6cm
+            model: Modelo YOLO ya cargado (opcional, ver arranque.py)
+            engine: Motor pyttsx3 ya inicializado (opcional)
+            voz: False para no inicializar la síntesis de voz (servicio.py)
+            controlador_resolucion: ControladorResolucion para ajustar el
+                                    imgsz según la latencia (opcional)
+            alarma: Activar la alarma de obstáculos por profundidad en
+                    cada frame (alarma_obstaculos.py)
         """
         print("🚀 Inicializando Sistema de Visión Estéreo...")
         
         # Cargar modelo YOLO
-        self.model = YOLO(model_path)
+        self.model = model if model is not None else cargar_modelo(model_path)
         print(f"✅ Modelo YOLO cargado: {model_path}")
         
         # Parámetros de cámaras estéreo
         self.focal_length = focal_length
         self.baseline = baseline
         
+        self._stereo = None
+        
+        # Localización 3D con tablas precalculadas
+        self.localizador = Localizador3D(focal_length, baseline)
+        
         # Sistema de síntesis de voz
-        self.engine = pyttsx3.init()
-        self.engine.setProperty('rate', 150)
-        self.engine.setProperty('volume', 1.0)
+        if engine is None and voz:
+            engine = crear_motor_voz()
+        self.engine = engine
+        self.voz = ColaVoz(engine) if engine is not None else None
+        
+        # Resolución dinámica de inferencia (None = imgsz por defecto)
+        self.controlador_resolucion = controlador_resolucion
+        
+        # Alarma de obstáculos no clasificados (independiente de YOLO)
+        self.alarma = AlarmaObstaculos(focal_length, baseline) if alarma else None
         
         # Control de notificaciones
         self.last_notification = {}
@@ -97,50 +143,68 @@ class SistemaVisionEstereo:
         
         return distance
     
-    def calcular_mapa_disparidad(self, frame_left, frame_right):
+    def calcular_mapa_disparidad(self, frame_left, frame_right, buffers=None):
         """
         Calcula el mapa de disparidad entre las dos imágenes
         
         Args:
             frame_left: Imagen de cámara izquierda
             frame_right: Imagen de cámara derecha
+            buffers: BuffersFrame (memoria.py) para escribir en arrays
+                     reutilizados en lugar de reservar nuevos (opcional)
         
         Returns:
             np.array: Mapa de disparidad
         """
-        # Convertir a escala de grises
-        gray_left = cv2.cvtColor(frame_left, cv2.COLOR_BGR2GRAY)
-        gray_right = cv2.cvtColor(frame_right, cv2.COLOR_BGR2GRAY)
-        
-        # Crear objeto StereoSGBM
-        stereo = cv2.StereoSGBM_create(
-            minDisparity=0,
-            numDisparities=64,  # Debe ser divisible por 16
-            blockSize=11,
-            P1=8 * 3 * 11**2,
-            P2=32 * 3 * 11**2,
-            disp12MaxDiff=1,
-            uniquenessRatio=10,
-            speckleWindowSize=100,
-            speckleRange=32
-        )
-        
-        # Calcular disparidad
-        disparity = stereo.compute(gray_left, gray_right).astype(np.float32) / 16.0
+        # Crear objeto StereoSGBM (una sola vez)
+        if self._stereo is None:
+            self._stereo = cv2.StereoSGBM_create(
+                minDisparity=0,
+                numDisparities=64,  # Debe ser divisible por 16
+                blockSize=11,
+                P1=8 * 3 * 11**2,
+                P2=32 * 3 * 11**2,
+                disp12MaxDiff=1,
+                uniquenessRatio=10,
+                speckleWindowSize=100,
+                speckleRange=32
+            )
+        
+        if buffers is None:
+            # Convertir a escala de grises
+            gray_left = cv2.cvtColor(frame_left, cv2.COLOR_BGR2GRAY)
+            gray_right = cv2.cvtColor(frame_right, cv2.COLOR_BGR2GRAY)
+            
+            # Calcular disparidad
+            return self._stereo.compute(gray_left, gray_right).astype(np.float32) / 16.0
+        
+        forma = frame_left.shape[:2]
+        gray_left = cv2.cvtColor(frame_left, cv2.COLOR_BGR2GRAY,
+                                 dst=buffers.obtener('gris_izq', forma))
+        gray_right = cv2.cvtColor(frame_right, cv2.COLOR_BGR2GRAY,
+                                  dst=buffers.obtener('gris_der', forma))
+        raw = self._stereo.compute(gray_left, gray_right,
+                                   disparity=buffers.obtener('disparidad_raw', forma, np.int16))
+        disparity = buffers.obtener('disparidad', forma, np.float32)
+        np.multiply(raw, np.float32(1 / 16.0), out=disparity)
         
         return disparity
     
-    def notificar_voz(self, mensaje):
+    def notificar_voz(self, mensaje, prioritario=False):
         """
-        Notifica al usuario mediante síntesis de voz (en hilo separado)
+        Notifica al usuario mediante síntesis de voz (hilo de voz único,
+        ver cola_voz.py)
+        
+        Args:
+            mensaje: Texto a decir
+            prioritario: Se dice antes que los mensajes pendientes e
+                         interrumpe el mensaje en curso (alertas de
+                         obstáculo)
         """
-        def speak():
-            self.engine.say(mensaje)
-            self.engine.runAndWait()
+        if self.voz is None:
+            return
         
-        thread = threading.Thread(target=speak)
-        thread.daemon = True
-        thread.start()
+        self.voz.decir(mensaje, prioritario)
     
     def debe_notificar(self, objeto_clase):
         """
@@ -158,79 +222,139 @@ class SistemaVisionEstereo:
         
         return False
     
-    def procesar_detecciones(self, frame, results, disparity_map=None):
+    def extraer_detecciones(self, results, disparity_map=None):
         """
-        Procesa las detecciones y calcula distancias
+        Convierte los resultados de YOLO en registros con posición 3D
+        
+        Todas las cajas de un frame se localizan con una sola llamada
+        vectorizada a Localizador3D.
         
         Args:
-            frame: Frame de video
             results: Resultados de YOLO
             disparity_map: Mapa de disparidad (opcional)
         
         Returns:
-            frame con anotaciones
+            list: dicts con clase, confianza, bbox (x1, y1, x2, y2), centro,
+                  distancia en metros, posicion (X, Y, Z) y direccion
+                  ('izquierda', 'centro', 'derecha'); sin mapa de
+                  disparidad, distancia y posicion son None
         """
+        detecciones = []
+        
         for result in results:
             boxes = result.boxes
+            if len(boxes) == 0:
+                continue
             
-            for box in boxes:
-                # Obtener información de la detección
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                confidence = float(box.conf[0])
-                class_id = int(box.cls[0])
-                class_name = self.model.names[class_id]
-                
-                # Calcular centro del objeto
+            cajas = boxes.xyxy.cpu().numpy()
+            confianzas = boxes.conf.cpu().numpy()
+            clases = boxes.cls.cpu().numpy().astype(int)
+            
+            localizacion = None
+            if disparity_map is not None:
+                localizacion = self.localizador.localizar(disparity_map, cajas)
+                direcciones = localizacion['direccion']
+            else:
+                direcciones = self.localizador.direcciones(
+                    (cajas[:, 0] + cajas[:, 2]) / 2, result.orig_shape
+                )
+            
+            for i, (x1, y1, x2, y2) in enumerate(cajas.astype(int)):
                 x_center = (x1 + x2) / 2
                 y_center = (y1 + y2) / 2
                 
-                # Calcular distancia si hay mapa de disparidad
-                distance = None
-                if disparity_map is not None:
-                    distance = self.calcular_distancia_estereo(
-                        disparity_map, x_center, y_center
-                    )
-                
-                # Preparar etiqueta
-                label = f"{class_name}: {confidence:.2f}"
-                if distance is not None and distance > 0:
-                    label += f" - {distance:.2f}m"
-                    
-                    # Notificación de voz para objetos cercanos
-                    if distance < 2.0 and self.debe_notificar(class_name):
-                        mensaje = f"{class_name} a {distance:.1f} metros"
-                        self.notificar_voz(mensaje)
+                distance = posicion = None
+                if localizacion is not None and np.isfinite(localizacion['distancia'][i]):
+                    distance = float(localizacion['distancia'][i])
+                    posicion = tuple(float(c) for c in localizacion['xyz'][i])
                 
-                # Dibujar bounding box
-                color = self.colors.get(class_name, (255, 255, 255))
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                
-                # Dibujar etiqueta
-                (w, h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
-                cv2.rectangle(frame, (x1, y1 - h - 10), (x1 + w, y1), color, -1)
-                cv2.putText(frame, label, (x1, y1 - 5),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+                detecciones.append({
+                    'clase': self.model.names[int(clases[i])],
+                    'confianza': float(confianzas[i]),
+                    'bbox': (int(x1), int(y1), int(x2), int(y2)),
+                    'centro': (x_center, y_center),
+                    'distancia': distance,
+                    'posicion': posicion,
+                    'direccion': str(direcciones[i]),
+                })
+        
+        return detecciones
+    
+    def procesar_detecciones(self, frame, results, disparity_map=None, detecciones=None):
+        """
+        Procesa las detecciones y calcula distancias
+        
+        Args:
+            frame: Frame de video
+            results: Resultados de YOLO
+            disparity_map: Mapa de disparidad (opcional)
+            detecciones: Registros ya extraídos con extraer_detecciones
+                         (opcional, evita recalcularlos)
+        
+        Returns:
+            frame con anotaciones
+        """
+        if detecciones is None:
+            detecciones = self.extraer_detecciones(results, disparity_map)
+        
+        for det in detecciones:
+            x1, y1, x2, y2 = det['bbox']
+            x_center, y_center = det['centro']
+            class_name = det['clase']
+            distance = det['distancia']
+            
+            # Preparar etiqueta
+            label = f"{class_name}: {det['confianza']:.2f}"
+            if distance is not None and distance > 0:
+                label += f" - {distance:.2f}m"
                 
-                # Dibujar punto central
-                cv2.circle(frame, (int(x_center), int(y_center)), 5, color, -1)
+                # Notificación de voz para objetos cercanos
+                if distance < 2.0 and self.debe_notificar(class_name):
+                    mensaje = (f"{class_name} a {distance:.1f} metros "
+                               f"{FRASES_DIRECCION[det['direccion']]}")
+                    self.notificar_voz(mensaje)
+            
+            # Dibujar bounding box
+            color = self.colors.get(class_name, (255, 255, 255))
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            
+            # Dibujar etiqueta
+            (w, h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+            cv2.rectangle(frame, (x1, y1 - h - 10), (x1 + w, y1), color, -1)
+            cv2.putText(frame, label, (x1, y1 - 5),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+            
+            # Dibujar punto central
+            cv2.circle(frame, (int(x_center), int(y_center)), 5, color, -1)
         
         return frame
     
-    def ejecutar_deteccion_estereo(self, cam_left_id=0, cam_right_id=1):
+    def ejecutar_deteccion_estereo(self, cam_left_id=0, cam_right_id=1, caps=None, linea_tiempo=None,
+                                   preasignar_buffers=False, monitor_memoria=None):
         """
         Ejecuta el sistema completo con 2 cámaras
         
         Args:
             cam_left_id: ID de cámara izquierda
             cam_right_id: ID de cámara derecha
+            caps: Par (cap_left, cap_right) ya abierto (opcional)
+            linea_tiempo: LineaDeTiempo de arranque.py donde marcar la
+                          primera detección (opcional)
+            preasignar_buffers: Reutilizar los arrays de captura,
+                                disparidad y visualización entre frames
+            monitor_memoria: MonitorMemoria (memoria.py) para reportar
+                             memoria y pausas del GC (opcional)
         """
-        print(f"\n🎥 Iniciando cámaras...")
-        print(f"   Cámara izquierda: {cam_left_id}")
-        print(f"   Cámara derecha: {cam_right_id}")
-        
-        # Inicializar cámaras
-        cap_left = cv2.VideoCapture(cam_left_id)
-        cap_right = cv2.VideoCapture(cam_right_id)
+        if caps is not None:
+            cap_left, cap_right = caps
+        else:
+            print(f"\n🎥 Iniciando cámaras...")
+            print(f"   Cámara izquierda: {cam_left_id}")
+            print(f"   Cámara derecha: {cam_right_id}")
+            
+            # Inicializar cámaras
+            cap_left = cv2.VideoCapture(cam_left_id)
+            cap_right = cv2.VideoCapture(cam_right_id)
         
         if not cap_left.isOpened() or not cap_right.isOpened():
             print("❌ Error: No se pudieron abrir las cámaras")
@@ -241,44 +365,111 @@ class SistemaVisionEstereo:
         print("   - Presiona 'q' para salir")
         print("   - Presiona 's' para capturar pantalla")
         print("   - Presiona 'd' para activar/desactivar mapa de disparidad")
+        print("   - Presiona 'r' para iniciar/detener grabación estéreo")
         print("\n🚀 Sistema activo...\n")
         
         show_disparity = True
+        grabador = None
+        detecciones = []
+        buffers = BuffersFrame() if preasignar_buffers else None
+        if monitor_memoria is not None:
+            monitor_memoria.iniciar()
         
         while True:
+            if monitor_memoria is not None:
+                monitor_memoria.inicio_frame()
+            
             # Capturar frames de ambas cámaras
-            ret_left, frame_left = cap_left.read()
-            ret_right, frame_right = cap_right.read()
+            if buffers is not None:
+                ret_left, frame_left = buffers.leer(cap_left, 'frame_left')
+                ret_right, frame_right = buffers.leer(cap_right, 'frame_right')
+            else:
+                ret_left, frame_left = cap_left.read()
+                ret_right, frame_right = cap_right.read()
             
             if not ret_left or not ret_right:
                 print("❌ Error al capturar frames")
                 break
             
+            if grabador is not None:
+                grabador.agregar(frame_left, frame_right)
+            
+            # Alarma de obstáculos por profundidad (antes de la inferencia,
+            # con las cajas ya clasificadas en el frame anterior)
+            alerta = None
+            if self.alarma is not None:
+                alerta = self.alarma.analizar(
+                    frame_left, frame_right, [d['bbox'] for d in detecciones], buffers
+                )
+                if alerta is not None:
+                    self.notificar_voz(mensaje_alerta(alerta), prioritario=True)
+            
             # Calcular mapa de disparidad
-            disparity_map = self.calcular_mapa_disparidad(frame_left, frame_right)
+            disparity_map = self.calcular_mapa_disparidad(frame_left, frame_right, buffers)
             
             # Realizar detección (solo en cámara izquierda)
-            results = self.model(frame_left, verbose=False)
+            if self.controlador_resolucion is not None:
+                inicio = time.perf_counter()
+                results = self.model(
+                    frame_left, verbose=False, imgsz=self.controlador_resolucion.imgsz
+                )
+                latencia_ms = (time.perf_counter() - inicio) * 1000
+            else:
+                results = self.model(frame_left, verbose=False)
+            
+            detecciones = self.extraer_detecciones(results, disparity_map)
             
-            # Procesar detecciones
+            if self.controlador_resolucion is not None:
+                self.controlador_resolucion.registrar(
+                    latencia_ms, detecciones, frame_left.shape[:2]
+                )
+            
+            # Procesar detecciones (sobre una copia del frame izquierdo)
+            if buffers is not None:
+                copia = buffers.obtener('anotado', frame_left.shape)
+                np.copyto(copia, frame_left)
+            else:
+                copia = frame_left.copy()
             frame_anotado = self.procesar_detecciones(
-                frame_left.copy(), results, disparity_map
+                copia, results, disparity_map, detecciones
             )
             
+            if alerta is not None:
+                dibujar_alerta(frame_anotado, alerta)
+            
+            if linea_tiempo is not None:
+                linea_tiempo.marcar('primera_deteccion')
+                linea_tiempo.reporte()
+                linea_tiempo = None
+            
             # Mostrar frames
             cv2.imshow('Sistema de Detección - Cámara Principal', frame_anotado)
             cv2.imshow('Cámara Derecha (Referencia)', frame_right)
             
             if show_disparity:
                 # Normalizar mapa de disparidad para visualización
-                disparity_normalized = cv2.normalize(
-                    disparity_map, None, 0, 255, cv2.NORM_MINMAX
-                )
-                disparity_colored = cv2.applyColorMap(
-                    disparity_normalized.astype(np.uint8), cv2.COLORMAP_JET
-                )
+                if buffers is not None:
+                    forma = disparity_map.shape
+                    disparity_normalized = cv2.normalize(
+                        disparity_map, buffers.obtener('disparidad_u8', forma),
+                        0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U
+                    )
+                    disparity_colored = cv2.applyColorMap(
+                        disparity_normalized, cv2.COLORMAP_JET,
+                        dst=buffers.obtener('disparidad_color', forma + (3,))
+                    )
+                else:
+                    disparity_normalized = cv2.normalize(
+                        disparity_map, None, 0, 255, cv2.NORM_MINMAX
+                    )
+                    disparity_colored = cv2.applyColorMap(
+                        disparity_normalized.astype(np.uint8), cv2.COLORMAP_JET
+                    )
                 cv2.imshow('Mapa de Disparidad', disparity_colored)
             
+            if monitor_memoria is not None:
+                monitor_memoria.fin_frame()
+            
             # Controles de teclado
             key = cv2.waitKey(1) & 0xFF
             if key == ord('q'):
@@ -292,6 +483,26 @@ class SistemaVisionEstereo:
                 show_disparity = not show_disparity
                 if not show_disparity:
                     cv2.destroyWindow('Mapa de Disparidad')
+            elif key == ord('r'):
+                if grabador is None:
+                    from grabacion import GrabadorEstereo
+                    
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    grabador = GrabadorEstereo(f'grabacion_{timestamp}.estereo')
+                    print(f"🔴 Grabando: grabacion_{timestamp}.estereo")
+                else:
+                    grabador.cerrar()
+                    grabador = None
+        
+        if grabador is not None:
+            grabador.cerrar()
+        
+        if monitor_memoria is not None:
+            monitor_memoria.reporte()
+            monitor_memoria.detener()
+        if buffers is not None:
+            print(f"🧱 Buffers: {buffers.bytes_totales() / 2**20:.1f} MB, "
+                  f"{buffers.asignaciones} reservas en total")
         
         # Liberar recursos
         cap_left.release()
@@ -299,24 +510,37 @@ class SistemaVisionEstereo:
         cv2.destroyAllWindows()
         print("✅ Sistema cerrado correctamente")
 
-def main():
+def main(monitorear_memoria=False):
     """
     Función principal
+    
+    Args:
+        monitorear_memoria: Reportar memoria residente, reservas por frame
+                            y pausas del GC (python detect.py --memoria)
     """
     # Ruta al modelo entrenado (ajustar según tu experimento)
     MODEL_PATH = "../results/exp1_base/weights/best.pt"
     
-    # Crear sistema
-    sistema = SistemaVisionEstereo(
+    from arranque import arranque_rapido
+    from resolucion_dinamica import ControladorResolucion
+    
+    # Crear sistema: modelo, voz y cámaras se inicializan en paralelo
+    # NOTA: Ajusta los IDs según tu configuración
+    # Típicamente: 0 (cámara integrada), 1 y 2 (cámaras USB)
+    sistema, caps, linea_tiempo = arranque_rapido(
         model_path=MODEL_PATH,
+        cam_left_id=0,
+        cam_right_id=1,
         focal_length=700,    # Ajustar según calibración
-        baseline=0.06        # 6 cm de separación entre cámaras
+        baseline=0.06,       # 6 cm de separación entre cámaras
+        controlador_resolucion=ControladorResolucion(latencia_objetivo_ms=100)
     )
     
-    # Ejecutar con 2 cámaras
-    # NOTA: Ajusta los IDs según tu configuración
-    # Típicamente: 0 (cámara integrada), 1 y 2 (cámaras USB)
-    sistema.ejecutar_deteccion_estereo(cam_left_id=0, cam_right_id=1)
+    # Ejecutar con 2 cámaras (buffers reutilizados entre frames)
+    sistema.ejecutar_deteccion_estereo(
+        caps=caps, linea_tiempo=linea_tiempo, preasignar_buffers=True,
+        monitor_memoria=MonitorMemoria() if monitorear_memoria else None
+    )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(monitorear_memoria='--memoria' in sys.argv)
\ No newline at end of file
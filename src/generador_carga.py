@@ -0,0 +1,181 @@
+"""
+Generador de Carga para servicio.py
+
+Simula varios clientes enviando frames al servicio y mide la latencia:
+- Modo cerrado (--fps 0): cada cliente espera la respuesta antes de
+  enviar el siguiente frame por su conexión keep-alive
+- Modo abierto (--fps N): cada cliente envía N frames/s sin esperar
+  respuestas (una conexión por frame), como una cámara real; los frames
+  obsoletos son descartados por el servicio
+
+Las respuestas con estado distinto de 200 cuentan como errores y no
+entran en las latencias.
+
+Uso:
+    python generador_carga.py --clientes 8 --duracion 30 --fps 10 --estereo
+    python generador_carga.py --unix /tmp/servicio.sock
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import cv2
+import numpy as np
+
+def cargar_jpeg(ruta=None, ancho=640, alto=480):
+    """
+    Devuelve los bytes JPEG de una imagen (o de una sintética)
+    """
+    if ruta:
+        frame = cv2.imread(ruta)
+        if frame is None:
+            raise FileNotFoundError(ruta)
+    else:
+        frame = np.random.default_rng(0).integers(0, 255, (alto, ancho, 3), dtype=np.uint8)
+    ok, buffer = cv2.imencode('.jpg', frame)
+    return buffer.tobytes()
+
+async def _conectar(host, puerto, unix=None):
+    """Abre una conexión TCP (o al socket Unix si se indica `unix`)"""
+    if unix:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, puerto)
+
+async def _enviar(reader, writer, ruta, cuerpo, cabeceras):
+    """Envía una petición HTTP y devuelve (código de estado, JSON de respuesta)"""
+    lineas = [f"POST {ruta} HTTP/1.1", f"Content-Length: {len(cuerpo)}"]
+    lineas += [f"{k}: {v}" for k, v in cabeceras.items()]
+    writer.write(("\r\n".join(lineas) + "\r\n\r\n").encode() + cuerpo)
+    await writer.drain()
+
+    estado = (await reader.readline()).decode('latin-1').split()
+    if len(estado) < 2:
+        raise ConnectionError("respuesta sin línea de estado")
+    codigo = int(estado[1])
+
+    longitud = 0
+    while True:
+        linea = await reader.readline()
+        if linea in (b'\r\n', b'\n', b''):
+            break
+        nombre, _, valor = linea.decode('latin-1').partition(':')
+        if nombre.strip().lower() == 'content-length':
+            longitud = int(valor)
+    return codigo, json.loads(await reader.readexactly(longitud))
+
+async def cliente(id_cliente, host, puerto, cuerpo, ruta, cabeceras, duracion, fps, registro,
+                  unix=None):
+    """
+    Un cliente: envía frames durante `duracion` segundos
+    """
+    cabeceras = dict(cabeceras, **{'X-Cliente': f'cliente{id_cliente}'})
+    fin = time.perf_counter() + duracion
+
+    async def una_peticion(mantener=None):
+        """Devuelve False si la conexión quedó inservible"""
+        inicio = time.perf_counter()
+        try:
+            if mantener is None:
+                reader, writer = await _conectar(host, puerto, unix)
+                codigo, respuesta = await _enviar(reader, writer, ruta, cuerpo,
+                                                  dict(cabeceras, Connection='close'))
+                writer.close()
+            else:
+                codigo, respuesta = await _enviar(*mantener, ruta, cuerpo, cabeceras)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            registro['errores'] += 1
+            return False
+
+        if codigo != 200:
+            registro['errores'] += 1
+            registro['codigos'][codigo] = registro['codigos'].get(codigo, 0) + 1
+        elif respuesta.get('descartado'):
+            registro['descartados'] += 1
+        else:
+            registro['latencias'].append((time.perf_counter() - inicio) * 1000)
+        return True
+
+    if fps <= 0:
+        conexion = await _conectar(host, puerto, unix)
+        while time.perf_counter() < fin:
+            if not await una_peticion(conexion):
+                conexion[1].close()
+                conexion = await _conectar(host, puerto, unix)
+        conexion[1].close()
+    else:
+        tareas = []
+        periodo = 1.0 / fps
+        while time.perf_counter() < fin:
+            tareas.append(asyncio.ensure_future(una_peticion()))
+            await asyncio.sleep(periodo)
+        await asyncio.gather(*tareas)
+
+async def generar_carga(host, puerto, clientes, duracion, fps, estereo, imagen=None, unix=None):
+    """
+    Lanza los clientes concurrentes e imprime el resumen de latencias
+
+    Returns:
+        dict: percentiles de latencia, throughput y descartes
+    """
+    jpeg = cargar_jpeg(imagen)
+    if estereo:
+        ruta, cuerpo = '/detectar_estereo', jpeg + jpeg
+        cabeceras = {'X-Longitud-Izquierda': len(jpeg)}
+    else:
+        ruta, cuerpo, cabeceras = '/detectar', jpeg, {}
+
+    registro = {'latencias': [], 'descartados': 0, 'errores': 0, 'codigos': {}}
+
+    print(f"🚦 {clientes} clientes, {duracion} s, "
+          f"{'modo abierto a ' + str(fps) + ' fps' if fps > 0 else 'modo cerrado'}, "
+          f"{'estéreo' if estereo else 'mono'}")
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[
+        cliente(i, host, puerto, cuerpo, ruta, cabeceras, duracion, fps, registro, unix)
+        for i in range(clientes)
+    ])
+    transcurrido = time.perf_counter() - inicio
+
+    latencias = np.array(registro['latencias']) if registro['latencias'] else np.zeros(1)
+    resumen = {
+        'clientes': clientes,
+        'atendidos': len(registro['latencias']),
+        'descartados': registro['descartados'],
+        'errores': registro['errores'],
+        'errores_http': registro['codigos'],
+        'frames_por_s': len(registro['latencias']) / transcurrido,
+        'latencia_p50_ms': float(np.percentile(latencias, 50)),
+        'latencia_p95_ms': float(np.percentile(latencias, 95)),
+        'latencia_p99_ms': float(np.percentile(latencias, 99)),
+    }
+
+    print(f"\n📊 Resultados:")
+    print(f"   Atendidos: {resumen['atendidos']} ({resumen['frames_por_s']:.1f} frames/s)")
+    print(f"   Descartados: {resumen['descartados']} | Errores: {resumen['errores']}")
+    if registro['codigos']:
+        print(f"   Respuestas de error HTTP: {registro['codigos']}")
+    print(f"   Latencia p50/p95/p99: {resumen['latencia_p50_ms']:.1f} / "
+          f"{resumen['latencia_p95_ms']:.1f} / {resumen['latencia_p99_ms']:.1f} ms")
+
+    return resumen
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generador de carga para servicio.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--unix", default=None, help="Ruta de socket Unix (en lugar de TCP)")
+    parser.add_argument("--clientes", type=int, default=4)
+    parser.add_argument("--duracion", type=float, default=20)
+    parser.add_argument("--fps", type=float, default=0,
+                        help="Frames/s por cliente (0 = esperar cada respuesta)")
+    parser.add_argument("--estereo", action="store_true")
+    parser.add_argument("--imagen", default=None, help="JPEG a enviar (por defecto, sintético)")
+    args = parser.parse_args()
+
+    asyncio.run(generar_carga(
+        args.host, args.puerto, args.clientes, args.duracion,
+        args.fps, args.estereo, args.imagen, args.unix
+    ))
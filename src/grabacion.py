@@ -0,0 +1,390 @@
+"""
+Grabación y Reproducción Estéreo
+
+Permite reproducir problemas de campo con entradas idénticas:
+1. GrabadorEstereo escribe los pares izquierda/derecha sincronizados,
+   con su timestamp, en un archivo .estereo por bloques (chunks); la
+   codificación JPEG y la escritura corren en un hilo aparte, para no
+   retrasar el bucle de detección
+2. ReproduccionEstereo lee el archivo mediante memory-mapping y ofrece
+   dos fuentes compatibles con cv2.VideoCapture (read, isOpened, get,
+   release) para ejecutar_deteccion_estereo(caps=...)
+3. La reproducción puede ir a la velocidad grabada o lo más rápido posible
+
+Formato .estereo (little-endian):
+    cabecera  'ESTR' | version u16 | reservado u16
+    bloque    'CHNK' | n u32 | n x [timestamp f8 | len_izq u4 | len_der u4 | izq | der]
+    índice    'INDX' | n u32 | n x [timestamp f8 | off_izq u8 | len_izq u4 | off_der u8 | len_der u4]
+    pie       offset_indice u8 | 'FIN!'
+Si la grabación se interrumpe antes del índice, se reconstruye
+recorriendo los bloques.
+
+Uso:
+    python grabacion.py grabar salida.estereo --izquierda 0 --derecha 1
+    python grabacion.py reproducir salida.estereo --modelo ../results/exp1_base/weights/best.pt [--rapido]
+"""
+
+import argparse
+import mmap
+import queue
+import struct
+import threading
+import time
+
+import cv2
+import numpy as np
+
+MAGIA = b'ESTR'
+VERSION = 1
+CABECERA = struct.Struct('<4sHH')
+BLOQUE = struct.Struct('<4sI')
+REGISTRO = struct.Struct('<dII')
+PIE = struct.Struct('<Q4s')
+
+DTYPE_INDICE = np.dtype([
+    ('timestamp', '<f8'),
+    ('off_izq', '<u8'), ('len_izq', '<u4'),
+    ('off_der', '<u8'), ('len_der', '<u4'),
+])
+
+class GrabadorEstereo:
+    """
+    Escribe pares estéreo sincronizados en un archivo .estereo
+    """
+
+    def __init__(self, ruta, frames_por_bloque=30, formato='.jpg', calidad=90,
+                 en_segundo_plano=True, max_cola=60):
+        """
+        Args:
+            ruta: Archivo de salida
+            frames_por_bloque: Pares acumulados en memoria antes de escribir
+            formato: '.jpg' (compacto) o '.png' (sin pérdida)
+            calidad: Calidad JPEG (0-100)
+            en_segundo_plano: Codificar y escribir en un hilo aparte
+            max_cola: Pares en espera de codificar; si se llena, los pares
+                      nuevos se descartan (y se cuentan) en lugar de
+                      bloquear al llamador
+        """
+        self.ruta = ruta
+        self.frames_por_bloque = frames_por_bloque
+        self.formato = formato
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, calidad] if formato == '.jpg' else []
+
+        self._archivo = open(ruta, 'wb')
+        self._archivo.write(CABECERA.pack(MAGIA, VERSION, 0))
+        self._pendientes = []
+        self._indice = []
+        self.frames = 0
+        self.descartados = 0
+
+        self._cola = None
+        self._error = None
+        if en_segundo_plano:
+            self._cola = queue.Queue(maxsize=max_cola)
+            self._hilo = threading.Thread(target=self._bucle_escritura, daemon=True)
+            self._hilo.start()
+
+    def agregar(self, frame_left, frame_right, timestamp=None):
+        """
+        Añade un par de frames (timestamp en segundos, por defecto ahora)
+
+        En segundo plano solo copia los frames (el llamador puede reutilizar
+        sus buffers) y los encola.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        if self._cola is None:
+            self._codificar(timestamp, frame_left, frame_right)
+            return
+
+        # Un fallo de la grabación no debe detener el bucle de detección
+        if self._error is not None:
+            self.descartados += 1
+            return
+        try:
+            self._cola.put_nowait((timestamp, frame_left.copy(), frame_right.copy()))
+        except queue.Full:
+            self.descartados += 1
+
+    def _codificar(self, timestamp, frame_left, frame_right):
+        ok_left, izq = cv2.imencode(self.formato, frame_left, self.params)
+        ok_right, der = cv2.imencode(self.formato, frame_right, self.params)
+        if not ok_left or not ok_right:
+            raise ValueError("No se pudo codificar el frame")
+
+        self._pendientes.append((timestamp, izq.tobytes(), der.tobytes()))
+        self.frames += 1
+
+        if len(self._pendientes) >= self.frames_por_bloque:
+            self._escribir_bloque()
+
+    def _bucle_escritura(self):
+        while True:
+            par = self._cola.get()
+            if par is None:
+                return
+            try:
+                self._codificar(*par)
+            except Exception as e:
+                self._error = e
+                print(f"❌ Error en la grabación: {e!r}")
+                return
+
+    def _escribir_bloque(self):
+        if not self._pendientes:
+            return
+
+        partes = [BLOQUE.pack(b'CHNK', len(self._pendientes))]
+        offset = self._archivo.tell() + BLOQUE.size
+        for timestamp, izq, der in self._pendientes:
+            partes += [REGISTRO.pack(timestamp, len(izq), len(der)), izq, der]
+            off_izq = offset + REGISTRO.size
+            off_der = off_izq + len(izq)
+            self._indice.append((timestamp, off_izq, len(izq), off_der, len(der)))
+            offset = off_der + len(der)
+
+        self._archivo.write(b''.join(partes))
+        self._archivo.flush()
+        self._pendientes = []
+
+    def cerrar(self):
+        """Escribe el último bloque, el índice y el pie"""
+        if self._archivo.closed:
+            return
+
+        if self._cola is not None:
+            if self._error is None:
+                self._cola.put(None)
+                self._hilo.join()
+            self._cola = None
+
+        self._escribir_bloque()
+        offset_indice = self._archivo.tell()
+        indice = np.array(self._indice, dtype=DTYPE_INDICE)
+        self._archivo.write(BLOQUE.pack(b'INDX', len(indice)) + indice.tobytes())
+        self._archivo.write(PIE.pack(offset_indice, b'FIN!'))
+        self._archivo.close()
+        print(f"💾 Grabación guardada: {self.ruta} ({self.frames} pares)")
+        if self.descartados:
+            print(f"⚠️  {self.descartados} pares descartados (la codificación no dio abasto)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+class ReproduccionEstereo:
+    """
+    Lee un archivo .estereo mediante memory-mapping
+    """
+
+    def __init__(self, ruta, tiempo_real=True, bucle=False):
+        """
+        Args:
+            ruta: Archivo .estereo
+            tiempo_real: True = respetar los timestamps grabados,
+                         False = lo más rápido posible
+            bucle: Volver al inicio al terminar
+        """
+        self.ruta = ruta
+        self.tiempo_real = tiempo_real
+        self.bucle = bucle
+
+        self._archivo = open(ruta, 'rb')
+        self._mm = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        self._datos = np.frombuffer(self._mm, dtype=np.uint8)
+
+        magia, version, _ = CABECERA.unpack_from(self._mm, 0)
+        if magia != MAGIA:
+            raise ValueError(f"{ruta} no es un archivo .estereo")
+
+        self.indice = self._leer_indice()
+        self.frames = len(self.indice)
+        duracion = self.indice['timestamp'][-1] - self.indice['timestamp'][0] if self.frames > 1 else 0
+        self.fps = (self.frames - 1) / duracion if duracion > 0 else 30.0
+
+        self.posicion = 0
+        self._inicio_reloj = None
+        print(f"📼 Reproducción: {ruta} ({self.frames} pares, {self.fps:.1f} fps)")
+
+    def _leer_indice(self):
+        """Índice del pie o, si falta, reconstruido recorriendo los bloques"""
+        if len(self._mm) >= CABECERA.size + PIE.size:
+            offset_indice, fin = PIE.unpack_from(self._mm, len(self._mm) - PIE.size)
+            if fin == b'FIN!':
+                marca, n = BLOQUE.unpack_from(self._mm, offset_indice)
+                if marca == b'INDX':
+                    return np.frombuffer(
+                        self._mm, dtype=DTYPE_INDICE, count=n,
+                        offset=offset_indice + BLOQUE.size
+                    )
+
+        print("⚠️  Grabación sin índice (interrumpida), reconstruyendo...")
+        registros = []
+        offset = CABECERA.size
+        while offset + BLOQUE.size <= len(self._mm):
+            marca, n = BLOQUE.unpack_from(self._mm, offset)
+            if marca != b'CHNK':
+                break
+            offset += BLOQUE.size
+            for _ in range(n):
+                if offset + REGISTRO.size > len(self._mm):
+                    break
+                timestamp, len_izq, len_der = REGISTRO.unpack_from(self._mm, offset)
+                off_izq = offset + REGISTRO.size
+                off_der = off_izq + len_izq
+                if off_der + len_der > len(self._mm):
+                    break
+                registros.append((timestamp, off_izq, len_izq, off_der, len_der))
+                offset = off_der + len_der
+        return np.array(registros, dtype=DTYPE_INDICE)
+
+    def _decodificar(self, offset, longitud):
+        # Vista sin copia sobre el mmap
+        return cv2.imdecode(self._datos[offset:offset + longitud], cv2.IMREAD_COLOR)
+
+    def leer_par(self):
+        """
+        Devuelve el siguiente par sincronizado
+
+        Returns:
+            tuple: (ok, frame_left, frame_right, timestamp)
+        """
+        if self.posicion >= self.frames:
+            if not self.bucle or self.frames == 0:
+                return False, None, None, None
+            self.posicion = 0
+            self._inicio_reloj = None
+
+        registro = self.indice[self.posicion]
+
+        if self.tiempo_real:
+            relativo = registro['timestamp'] - self.indice['timestamp'][0]
+            if self._inicio_reloj is None:
+                self._inicio_reloj = time.perf_counter() - relativo
+            espera = self._inicio_reloj + relativo - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+
+        frame_left = self._decodificar(int(registro['off_izq']), int(registro['len_izq']))
+        frame_right = self._decodificar(int(registro['off_der']), int(registro['len_der']))
+        self.posicion += 1
+
+        return True, frame_left, frame_right, float(registro['timestamp'])
+
+    def camaras(self):
+        """
+        Par de fuentes compatibles con cv2.VideoCapture para
+        ejecutar_deteccion_estereo(caps=...)
+        """
+        compartido = {'par': None}
+        return (
+            FuenteReproduccion(self, 0, compartido),
+            FuenteReproduccion(self, 1, compartido),
+        )
+
+    def cerrar(self):
+        if self._mm.closed:
+            return
+        del self._datos
+        self.indice = None
+        self._mm.close()
+        self._archivo.close()
+
+class FuenteReproduccion:
+    """
+    Lado izquierdo (0) o derecho (1) de una ReproduccionEstereo con la
+    interfaz de cv2.VideoCapture
+
+    El lado izquierdo avanza la reproducción; el derecho devuelve el
+    frame del mismo par, igual que las lecturas consecutivas del bucle
+    estéreo.
+    """
+
+    def __init__(self, reproduccion, lado, compartido):
+        self.reproduccion = reproduccion
+        self.lado = lado
+        self._compartido = compartido
+        self._abierta = True
+
+    def isOpened(self):
+        return self._abierta
+
+    def read(self, image=None):
+        if self.lado == 0 or self._compartido['par'] is None:
+            ok, frame_left, frame_right, _ = self.reproduccion.leer_par()
+            self._compartido['par'] = (ok, frame_left, frame_right)
+            if self.lado == 0:
+                return ok, frame_left
+
+        ok, frame_left, frame_right = self._compartido['par']
+        self._compartido['par'] = None
+        return ok, frame_right
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.reproduccion.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.reproduccion.frames)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.reproduccion.posicion)
+        return 0.0
+
+    def release(self):
+        self._abierta = False
+        if self.lado == 0:
+            self.reproduccion.cerrar()
+
+def grabar_camaras(ruta, cam_left_id=0, cam_right_id=1):
+    """
+    Graba las dos cámaras hasta pulsar 'q'
+    """
+    cap_left = cv2.VideoCapture(cam_left_id)
+    cap_right = cv2.VideoCapture(cam_right_id)
+    if not cap_left.isOpened() or not cap_right.isOpened():
+        print("❌ Error: No se pudieron abrir las cámaras")
+        return
+
+    print(f"🔴 Grabando en {ruta} (presiona 'q' para terminar)")
+    with GrabadorEstereo(ruta) as grabador:
+        while True:
+            ret_left, frame_left = cap_left.read()
+            ret_right, frame_right = cap_right.read()
+            if not ret_left or not ret_right:
+                break
+
+            grabador.agregar(frame_left, frame_right)
+            cv2.imshow('Grabando - Cámara Izquierda', frame_left)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+
+    cap_left.release()
+    cap_right.release()
+    cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grabación y reproducción estéreo")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_grabar = sub.add_parser("grabar")
+    p_grabar.add_argument("ruta")
+    p_grabar.add_argument("--izquierda", type=int, default=0)
+    p_grabar.add_argument("--derecha", type=int, default=1)
+
+    p_repro = sub.add_parser("reproducir")
+    p_repro.add_argument("ruta")
+    p_repro.add_argument("--modelo", default="../results/exp1_base/weights/best.pt")
+    p_repro.add_argument("--rapido", action="store_true",
+                         help="Reproducir lo más rápido posible")
+    args = parser.parse_args()
+
+    if args.comando == "grabar":
+        grabar_camaras(args.ruta, args.izquierda, args.derecha)
+    else:
+        from detect import SistemaVisionEstereo
+
+        reproduccion = ReproduccionEstereo(args.ruta, tiempo_real=not args.rapido)
+        sistema = SistemaVisionEstereo(model_path=args.modelo)
+        sistema.ejecutar_deteccion_estereo(caps=reproduccion.camaras())
@@ -0,0 +1,150 @@
+"""
+Localización 3D Vectorizada de Detecciones
+
+Convierte las cajas de un frame en posiciones X/Y/Z (metros) y dirección
+(izquierda/centro/derecha) con una sola llamada:
+1. Tabla disparidad -> profundidad precalculada (Z = f × B / d) con la
+   resolución subpíxel de StereoSGBM (1/16 de píxel)
+2. Tablas de rayos por columna y por fila ((u - cx) / f, (v - cy) / f),
+   equivalentes a una tabla por píxel para una cámara pinhole rectificada
+3. Disparidad de cada caja como mediana de una ventana en su centro,
+   para todas las cajas a la vez con indexado de NumPy
+"""
+
+import numpy as np
+
+DIRECCIONES = np.array(['izquierda', 'centro', 'derecha'])
+
+FRASES_DIRECCION = {
+    'izquierda': 'a la izquierda',
+    'centro': 'al frente',
+    'derecha': 'a la derecha',
+}
+
+class Localizador3D:
+    """
+    Localiza en 3D todas las detecciones de un frame
+    """
+
+    def __init__(
+        self,
+        focal_length,
+        baseline,
+        cx=None,
+        cy=None,
+        num_disparidades=64,
+        subpixel=16,
+        ventana=5,
+        angulo_centro=10.0
+    ):
+        """
+        Args:
+            focal_length: Distancia focal (píxeles)
+            baseline: Separación entre cámaras (metros)
+            cx, cy: Punto principal (por defecto, el centro de la imagen)
+            num_disparidades: Disparidad máxima del mapa (StereoSGBM)
+            subpixel: Divisiones por píxel de disparidad (16 en SGBM)
+            ventana: Lado de la ventana donde se toma la mediana
+            angulo_centro: Semiángulo (grados) considerado "centro"
+        """
+        self.focal_length = focal_length
+        self.baseline = baseline
+        self.cx = cx
+        self.cy = cy
+        self.subpixel = subpixel
+        self.angulo_centro = angulo_centro
+
+        # Tabla de profundidad: índice = disparidad × subpixel
+        niveles = np.arange(num_disparidades * subpixel + 1, dtype=np.float32)
+        self.lut_profundidad = np.full(niveles.shape, np.nan, dtype=np.float32)
+        self.lut_profundidad[1:] = focal_length * baseline * subpixel / niveles[1:]
+
+        # Desplazamientos de la ventana alrededor del centro de cada caja
+        r = ventana // 2
+        dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+        self._dy = dy.ravel()
+        self._dx = dx.ravel()
+
+        self._forma = None
+
+    def _preparar_rayos(self, alto, ancho):
+        """Tablas de rayos y dirección para un tamaño de imagen"""
+        cx = self.cx if self.cx is not None else (ancho - 1) / 2
+        cy = self.cy if self.cy is not None else (alto - 1) / 2
+
+        self.rayo_x = ((np.arange(ancho) - cx) / self.focal_length).astype(np.float32)
+        self.rayo_y = ((np.arange(alto) - cy) / self.focal_length).astype(np.float32)
+
+        # Dirección por columna: 0 izquierda, 1 centro, 2 derecha
+        limite = np.tan(np.radians(self.angulo_centro))
+        self.direccion_columna = np.where(
+            self.rayo_x < -limite, 0, np.where(self.rayo_x > limite, 2, 1)
+        )
+        self.rumbo_columna = np.degrees(np.arctan(self.rayo_x)).astype(np.float32)
+
+        self._forma = (alto, ancho)
+
+    def direcciones(self, columnas, forma):
+        """
+        Dirección de cada columna sin disparidad (p. ej. en modo mono)
+
+        Args:
+            columnas: Array de coordenadas u (píxeles)
+            forma: (alto, ancho) de la imagen
+        """
+        alto, ancho = forma[:2]
+        if self._forma != (alto, ancho):
+            self._preparar_rayos(alto, ancho)
+
+        u = np.clip(np.asarray(columnas).astype(np.intp), 0, ancho - 1)
+        return DIRECCIONES[self.direccion_columna[u]]
+
+    def localizar(self, disparity_map, cajas_xyxy):
+        """
+        Localiza todas las cajas de un frame
+
+        Args:
+            disparity_map: Mapa de disparidad en píxeles (float32)
+            cajas_xyxy: Array (N, 4) con x1, y1, x2, y2
+
+        Returns:
+            dict con arrays de longitud N:
+                'xyz': (N, 3) posición en metros (X derecha, Y abajo,
+                       Z adelante; NaN sin disparidad válida)
+                'distancia': Z en metros (NaN sin disparidad válida)
+                'rumbo': ángulo horizontal en grados (negativo = izquierda)
+                'direccion': 'izquierda' / 'centro' / 'derecha'
+        """
+        alto, ancho = disparity_map.shape[:2]
+        if self._forma != (alto, ancho):
+            self._preparar_rayos(alto, ancho)
+
+        cajas = np.asarray(cajas_xyxy, dtype=np.float32).reshape(-1, 4)
+        u = np.clip(((cajas[:, 0] + cajas[:, 2]) / 2).astype(np.intp), 0, ancho - 1)
+        v = np.clip(((cajas[:, 1] + cajas[:, 3]) / 2).astype(np.intp), 0, alto - 1)
+
+        # Mediana de la disparidad válida en la ventana de cada caja
+        vv = np.clip(v[:, None] + self._dy, 0, alto - 1)
+        uu = np.clip(u[:, None] + self._dx, 0, ancho - 1)
+        ventanas = disparity_map[vv, uu].astype(np.float32)
+        ventanas[ventanas <= 0] = np.nan
+        with np.errstate(all='ignore'):
+            if len(cajas):
+                validas = ~np.all(np.isnan(ventanas), axis=1)
+                disparidad = np.full(len(cajas), np.nan, dtype=np.float32)
+                disparidad[validas] = np.nanmedian(ventanas[validas], axis=1)
+            else:
+                disparidad = np.zeros(0, dtype=np.float32)
+
+        indices = np.rint(np.nan_to_num(disparidad) * self.subpixel).astype(np.intp)
+        indices = np.clip(indices, 0, len(self.lut_profundidad) - 1)
+        z = self.lut_profundidad[indices]
+
+        xyz = np.stack([self.rayo_x[u] * z, self.rayo_y[v] * z, z], axis=1)
+
+        return {
+            'xyz': xyz,
+            'distancia': z,
+            'rumbo': self.rumbo_columna[u],
+            'direccion': DIRECCIONES[self.direccion_columna[u]],
+        }
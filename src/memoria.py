@@ -0,0 +1,163 @@
+"""
+Buffers Preasignados y Monitor de Memoria
+
+Herramientas para que el bucle de frames no reserve memoria en cada
+iteración:
+1. BuffersFrame: arrays reutilizables por nombre, para pasarlos como
+   destino (dst=, out=) a OpenCV y NumPy
+2. MonitorMemoria: memoria residente, pico, memoria transitoria
+   reservada por frame (tracemalloc) y pausas del recolector de basura
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+class BuffersFrame:
+    """
+    Pool de arrays reutilizables entre frames
+    """
+
+    def __init__(self):
+        self._buffers = {}
+        self.asignaciones = 0
+
+    def obtener(self, nombre, forma, dtype=np.uint8):
+        """
+        Devuelve el buffer `nombre`, creándolo solo si cambia la forma o el tipo
+        """
+        buffer = self._buffers.get(nombre)
+        if buffer is None or buffer.shape != tuple(forma) or buffer.dtype != dtype:
+            buffer = np.empty(forma, dtype=dtype)
+            self._buffers[nombre] = buffer
+            self.asignaciones += 1
+        return buffer
+
+    def leer(self, cap, nombre):
+        """
+        cap.read() sobre el buffer `nombre` (OpenCV lo reutiliza si la
+        forma coincide)
+        """
+        ret, frame = cap.read(self._buffers.get(nombre))
+        if ret:
+            if self._buffers.get(nombre) is not frame:
+                self.asignaciones += 1
+            self._buffers[nombre] = frame
+        return ret, frame
+
+    def bytes_totales(self):
+        return sum(b.nbytes for b in self._buffers.values())
+
+def _rss_actual_mb():
+    """Memoria residente actual (Linux: /proc; otros: pico del proceso)"""
+    try:
+        with open('/proc/self/statm') as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return _rss_pico_mb()
+
+def _rss_pico_mb():
+    if resource is None:
+        return 0.0
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    return pico / 2**20 if sys.platform == 'darwin' else pico / 2**10
+
+class MonitorMemoria:
+    """
+    Mide memoria y pausas del GC por frame
+
+    Con `rastrear=True` usa tracemalloc (los arrays de NumPy y OpenCV se
+    registran ahí) para medir cuánta memoria transitoria se reserva en cada
+    frame; tiene coste, así que solo debe activarse para diagnosticar.
+    """
+
+    def __init__(self, rastrear=True, intervalo_reporte=300):
+        """
+        Args:
+            rastrear: Activar tracemalloc para medir reservas por frame
+            intervalo_reporte: Frames entre reportes impresos
+        """
+        self.rastrear = rastrear
+        self.intervalo_reporte = intervalo_reporte
+
+        self.frames = 0
+        self.transitoria = []
+        self._actual_inicio = 0
+        self.rss_inicial = None
+        self.rss_max = 0.0
+
+        self.pausas_gc = []
+        self._inicio_gc = None
+
+    def iniciar(self):
+        if self.rastrear and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        gc.callbacks.append(self._callback_gc)
+        self.rss_inicial = _rss_actual_mb()
+
+    def _callback_gc(self, fase, info):
+        if fase == 'start':
+            self._inicio_gc = time.perf_counter()
+        elif self._inicio_gc is not None:
+            self.pausas_gc.append((time.perf_counter() - self._inicio_gc) * 1000)
+            self._inicio_gc = None
+
+    def inicio_frame(self):
+        if self.rastrear:
+            tracemalloc.reset_peak()
+            self._actual_inicio = tracemalloc.get_traced_memory()[0]
+
+    def fin_frame(self):
+        self.frames += 1
+
+        if self.rastrear:
+            actual, pico = tracemalloc.get_traced_memory()
+            self.transitoria.append((pico - self._actual_inicio) / 2**20)
+            del self.transitoria[:-self.intervalo_reporte]
+
+        self.rss_max = max(self.rss_max, _rss_actual_mb())
+
+        if self.frames % self.intervalo_reporte == 0:
+            self.reporte()
+
+    def resumen(self):
+        return {
+            'frames': self.frames,
+            'rss_inicial_mb': self.rss_inicial,
+            'rss_actual_mb': _rss_actual_mb(),
+            'rss_max_mb': self.rss_max,
+            'rss_pico_proceso_mb': _rss_pico_mb(),
+            'transitoria_media_mb': float(np.mean(self.transitoria)) if self.transitoria else None,
+            'transitoria_max_mb': float(np.max(self.transitoria)) if self.transitoria else None,
+            'colecciones_gc': len(self.pausas_gc),
+            'pausa_gc_total_ms': float(sum(self.pausas_gc)),
+            'pausa_gc_max_ms': float(max(self.pausas_gc)) if self.pausas_gc else 0.0,
+        }
+
+    def reporte(self):
+        r = self.resumen()
+        print(f"\n🧠 Memoria ({r['frames']} frames):")
+        print(f"   RSS: {r['rss_actual_mb']:.1f} MB (inicial {r['rss_inicial_mb']:.1f}, "
+              f"máx {r['rss_max_mb']:.1f}, pico proceso {r['rss_pico_proceso_mb']:.1f})")
+        if r['transitoria_media_mb'] is not None:
+            print(f"   Reservas por frame: media {r['transitoria_media_mb']:.2f} MB, "
+                  f"máx {r['transitoria_max_mb']:.2f} MB")
+        print(f"   GC: {r['colecciones_gc']} colecciones, {r['pausa_gc_total_ms']:.1f} ms "
+              f"en total (máx {r['pausa_gc_max_ms']:.2f} ms)")
+
+    def detener(self):
+        if self._callback_gc in gc.callbacks:
+            gc.callbacks.remove(self._callback_gc)
+        if self.rastrear and tracemalloc.is_tracing():
+            tracemalloc.stop()
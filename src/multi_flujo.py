@@ -0,0 +1,310 @@
+"""
+Servicio Multi-Flujo: Varios Pares Estéreo con Inferencia por Lotes
+
+Un solo equipo atiende a varios usuarios, cada uno con su par de cámaras:
+1. Un hilo de captura por flujo conserva solo el último par de frames
+2. Un hilo de inferencia junta los frames nuevos de todos los flujos
+   (ventana de batching corta) en una sola llamada al modelo
+3. Las detecciones vuelven a cada flujo, que calcula su disparidad,
+   distancias y notificaciones de voz en su propio hilo
+4. Un único hilo de voz (cola_voz.py) dice los mensajes de todos los
+   flujos en orden
+5. Equidad: cada flujo aporta como máximo un frame por lote, los flujos
+   menos atendidos entran primero y nadie espera a una cámara lenta
+
+Uso:
+    python multi_flujo.py --flujos 0,1 2,3
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from cola_voz import ColaVoz
+from detect import SistemaVisionEstereo, cargar_modelo, crear_motor_voz
+
+class SistemaFlujo(SistemaVisionEstereo):
+    """
+    SistemaVisionEstereo de un flujo: las notificaciones van a la ColaVoz
+    compartida en lugar de a un motor propio
+    """
+
+    def __init__(self, nombre, cola_voz, *args, **kwargs):
+        # La alarma de obstáculos no corre en el post-proceso multi-flujo
+        super().__init__(*args, voz=False, alarma=False, **kwargs)
+        self.nombre = nombre
+        self.cola_voz = cola_voz
+
+    def notificar_voz(self, mensaje, prioritario=False):
+        self.cola_voz.decir(mensaje, prioritario, origen=self.nombre)
+
+class FlujoEstereo:
+    """
+    Un par de cámaras (un usuario) y su último par de frames capturado
+    """
+
+    def __init__(self, nombre, fuente_left, fuente_right, sistema):
+        self.nombre = nombre
+        self.sistema = sistema
+        self.cap_left = cv2.VideoCapture(fuente_left)
+        self.cap_right = cv2.VideoCapture(fuente_right)
+
+        self._lock = threading.Lock()
+        self._ultimo = None          # (frame_left, frame_right, instante)
+        self._secuencia = 0
+        self._secuencia_tomada = 0
+
+        self.ocupado = False         # post-proceso del lote anterior en curso
+        self.ultima_atencion = 0.0
+        self.frame_anotado = None
+        self.activo = True
+
+        # Estadísticas
+        self.capturados = 0
+        self.procesados = 0
+
+    def abierto(self):
+        return self.cap_left.isOpened() and self.cap_right.isOpened()
+
+    def bucle_captura(self):
+        """Lee frames continuamente y conserva solo el más reciente"""
+        while self.activo:
+            ret_left, frame_left = self.cap_left.read()
+            ret_right, frame_right = self.cap_right.read()
+
+            if not ret_left or not ret_right:
+                print(f"❌ [{self.nombre}] Error al capturar frames")
+                self.activo = False
+                break
+
+            with self._lock:
+                self._ultimo = (frame_left, frame_right, time.perf_counter())
+                self._secuencia += 1
+                self.capturados += 1
+
+    def hay_nuevo(self):
+        with self._lock:
+            return self._secuencia > self._secuencia_tomada
+
+    def tomar_ultimo(self):
+        """Devuelve el último par no procesado (o None)"""
+        with self._lock:
+            if self._secuencia == self._secuencia_tomada:
+                return None
+            self._secuencia_tomada = self._secuencia
+            return self._ultimo
+
+    def liberar(self):
+        self.activo = False
+        self.cap_left.release()
+        self.cap_right.release()
+
+class ServidorMultiFlujo:
+    """
+    Ejecuta la detección estéreo de N flujos con un único modelo compartido
+    """
+
+    def __init__(
+        self,
+        model_path,
+        fuentes,
+        focal_length=700,
+        baseline=0.06,
+        ventana_ms=10,
+        max_batch=None
+    ):
+        """
+        Args:
+            model_path: Ruta al modelo YOLO entrenado
+            fuentes: Lista de pares (fuente_left, fuente_right), uno por usuario
+            focal_length: Distancia focal de las cámaras (píxeles)
+            baseline: Separación entre cámaras (metros)
+            ventana_ms: Espera máxima para completar un lote desde que
+                        llega el primer frame
+            max_batch: Máximo de frames por llamada al modelo
+                       (None = número de flujos)
+        """
+        print(f"🚀 Inicializando servidor multi-flujo ({len(fuentes)} flujos)...")
+
+        model = cargar_modelo(model_path)
+        self.voz = ColaVoz(crear_motor_voz())
+
+        self.flujos = []
+        for i, (fuente_left, fuente_right) in enumerate(fuentes):
+            nombre = f"flujo{i}"
+            sistema = SistemaFlujo(
+                nombre, self.voz, model_path, focal_length, baseline, model=model
+            )
+            self.flujos.append(FlujoEstereo(nombre, fuente_left, fuente_right, sistema))
+
+        self.model = model
+        self.ventana = ventana_ms / 1000
+        self.max_batch = max_batch or len(self.flujos)
+        self.activo = False
+
+        # Un hilo de post-proceso por flujo: la disparidad (SGBM) libera el
+        # GIL, así que los flujos se procesan en paralelo
+        self._post = ThreadPoolExecutor(max_workers=len(self.flujos))
+
+        # Estadísticas de lotes
+        self.lotes = 0
+        self.frames_inferidos = 0
+
+    def _recolectar_lote(self):
+        """
+        Junta como máximo un frame nuevo por flujo
+
+        Espera hasta `ventana` desde el primer frame disponible para
+        completar el lote; los flujos atendidos hace más tiempo tienen
+        prioridad cuando hay más flujos listos que `max_batch`.
+        """
+        inicio = None
+        while self.activo:
+            # Solo cuentan los flujos que pueden aportar frame a este lote
+            # (no los detenidos ni los que aún post-procesan el anterior)
+            disponibles = [f for f in self.flujos if f.activo and not f.ocupado]
+            listos = [f for f in disponibles if f.hay_nuevo()]
+
+            if listos and inicio is None:
+                inicio = time.perf_counter()
+
+            completos = len(listos) >= min(self.max_batch, len(disponibles))
+            if listos and (completos or time.perf_counter() - inicio >= self.ventana):
+                listos.sort(key=lambda f: f.ultima_atencion)
+                lote = []
+                for flujo in listos[:self.max_batch]:
+                    par = flujo.tomar_ultimo()
+                    if par is not None:
+                        lote.append((flujo, par))
+                if lote:
+                    return lote
+                inicio = None
+
+            time.sleep(0.001)
+
+        return []
+
+    def _post_procesar(self, flujo, par, result):
+        """Disparidad, distancias y notificaciones de un flujo"""
+        frame_left, frame_right, _ = par
+        try:
+            disparity_map = flujo.sistema.calcular_mapa_disparidad(frame_left, frame_right)
+            flujo.frame_anotado = flujo.sistema.procesar_detecciones(
+                frame_left.copy(), [result], disparity_map
+            )
+            flujo.procesados += 1
+        except Exception as e:
+            # El Future de submit() no se consulta: sin esto el error se perdería
+            print(f"❌ [{flujo.nombre}] Error en el post-proceso: {e!r}")
+        finally:
+            flujo.ocupado = False
+
+    def bucle_inferencia(self):
+        """Una llamada al modelo por lote y reparto de resultados"""
+        while self.activo:
+            lote = self._recolectar_lote()
+            if not lote:
+                continue
+
+            frames = [par[0] for _, par in lote]
+            results = self.model(frames, verbose=False)
+
+            ahora = time.perf_counter()
+            for (flujo, par), result in zip(lote, results):
+                flujo.ocupado = True
+                flujo.ultima_atencion = ahora
+                self._post.submit(self._post_procesar, flujo, par, result)
+
+            self.lotes += 1
+            self.frames_inferidos += len(lote)
+
+    def imprimir_estadisticas(self, transcurrido):
+        total = sum(f.procesados for f in self.flujos)
+        print(f"\n📊 Estadísticas ({transcurrido:.0f} s):")
+        for flujo in self.flujos:
+            print(f"   {flujo.nombre}: {flujo.procesados / transcurrido:.1f} frames/s "
+                  f"({flujo.capturados - flujo.procesados} descartados)")
+        print(f"   Total: {total / transcurrido:.1f} frames/s | "
+              f"lote medio: {self.frames_inferidos / max(self.lotes, 1):.2f}")
+
+    def ejecutar(self, mostrar=True, intervalo_estadisticas=10.0):
+        """
+        Arranca captura, inferencia y visualización
+
+        Args:
+            mostrar: Mostrar una ventana por flujo (cv2.imshow solo se
+                     llama desde el hilo principal)
+            intervalo_estadisticas: Segundos entre reportes de frames/s
+        """
+        for flujo in self.flujos:
+            if not flujo.abierto():
+                print(f"❌ Error: No se pudieron abrir las cámaras de {flujo.nombre}")
+                return
+
+        self.activo = True
+        hilos = [threading.Thread(target=f.bucle_captura, daemon=True) for f in self.flujos]
+        hilos.append(threading.Thread(target=self.bucle_inferencia, daemon=True))
+        for hilo in hilos:
+            hilo.start()
+
+        print("✅ Servidor multi-flujo activo")
+        print("\n📌 Presiona 'q' para salir (o Ctrl+C sin ventanas)\n")
+
+        inicio = time.perf_counter()
+        ultimo_reporte = inicio
+        try:
+            while any(f.activo for f in self.flujos):
+                if mostrar:
+                    for flujo in self.flujos:
+                        if flujo.frame_anotado is not None:
+                            cv2.imshow(f'Detección - {flujo.nombre}', flujo.frame_anotado)
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+                else:
+                    time.sleep(0.05)
+
+                ahora = time.perf_counter()
+                if ahora - ultimo_reporte >= intervalo_estadisticas:
+                    self.imprimir_estadisticas(ahora - inicio)
+                    ultimo_reporte = ahora
+        except KeyboardInterrupt:
+            pass
+
+        print("\n👋 Cerrando servidor...")
+        self.activo = False
+        for flujo in self.flujos:
+            flujo.liberar()
+        self._post.shutdown(wait=True)
+        self.imprimir_estadisticas(time.perf_counter() - inicio)
+        cv2.destroyAllWindows()
+        print("✅ Servidor cerrado correctamente")
+
+def _parsear_fuente(valor):
+    """'0' -> 0 (cámara), cualquier otro texto -> ruta o URL"""
+    return int(valor) if valor.isdigit() else valor
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detección estéreo multi-flujo")
+    parser.add_argument("--modelo", default="../results/exp1_base/weights/best.pt")
+    parser.add_argument("--flujos", nargs="+", default=["0,1"],
+                        help="Pares izquierda,derecha (IDs de cámara o rutas)")
+    parser.add_argument("--ventana-ms", type=float, default=10)
+    parser.add_argument("--max-batch", type=int, default=None)
+    parser.add_argument("--sin-ventanas", action="store_true")
+    args = parser.parse_args()
+
+    fuentes = []
+    for par in args.flujos:
+        left, right = par.split(",")
+        fuentes.append((_parsear_fuente(left), _parsear_fuente(right)))
+
+    servidor = ServidorMultiFlujo(
+        args.modelo,
+        fuentes,
+        ventana_ms=args.ventana_ms,
+        max_batch=args.max_batch,
+    )
+    servidor.ejecutar(mostrar=not args.sin_ventanas)
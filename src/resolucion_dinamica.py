@@ -0,0 +1,166 @@
+"""
+Control Dinámico de Resolución de Entrada
+
+Ajusta el imgsz de la inferencia YOLO entre tamaños predefinidos para
+mantener estable la tasa de frames en equipos con throttling térmico:
+1. Baja de resolución si la latencia medida supera el objetivo
+2. Sube si la latencia estimada al tamaño siguiente cabe en el objetivo
+3. Refuerzo temporal (un tamaño más) cuando se esperan objetos pequeños
+   o lejanos, p. ej. 'letrero' o 'poste de luz'
+Todos los cambios se registran en `historial` y se imprimen.
+"""
+
+import time
+
+class ControladorResolucion:
+    """
+    Elige el imgsz de cada inferencia según la latencia y las detecciones
+    """
+
+    def __init__(
+        self,
+        latencia_objetivo_ms=100,
+        tamanos=(320, 416, 512, 640),
+        tamano_inicial=None,
+        clases_pequenas=('letrero', 'poste de luz'),
+        distancia_lejana=4.0,
+        area_pequena=0.002,
+        frames_refuerzo=15,
+        frames_estables=10,
+        margen=0.15,
+        suavizado=0.2
+    ):
+        """
+        Args:
+            latencia_objetivo_ms: Latencia de inferencia deseada por frame
+            tamanos: Tamaños de entrada permitidos (múltiplos de 32)
+            tamano_inicial: Tamaño de arranque (por defecto el mayor)
+            clases_pequenas: Clases que activan el refuerzo de resolución
+            distancia_lejana: Distancia (m) a partir de la cual un objeto
+                              activa el refuerzo
+            area_pequena: Fracción del frame por debajo de la cual una caja
+                          activa el refuerzo
+            frames_refuerzo: Frames que dura el refuerzo
+            frames_estables: Frames seguidos fuera de margen antes de cambiar
+            margen: Histéresis relativa alrededor del objetivo
+            suavizado: Peso de la última medición en la media exponencial
+        """
+        self.tamanos = sorted(tamanos)
+        self.objetivo = latencia_objetivo_ms
+        self.clases_pequenas = set(clases_pequenas)
+        self.distancia_lejana = distancia_lejana
+        self.area_pequena = area_pequena
+        self.frames_refuerzo = frames_refuerzo
+        self.frames_estables = frames_estables
+        self.margen = margen
+        self.suavizado = suavizado
+
+        inicial = tamano_inicial or self.tamanos[-1]
+        self.nivel = self.tamanos.index(inicial)
+        self.refuerzo = 0
+        self.latencia_media = None
+        self._fuera_de_margen = 0
+        self._frame = 0
+
+        self.historial = []
+
+    @property
+    def imgsz(self):
+        """Tamaño a usar en la próxima inferencia"""
+        if self.refuerzo > 0:
+            return self.tamanos[min(self.nivel + 1, len(self.tamanos) - 1)]
+        return self.tamanos[self.nivel]
+
+    def _registrar_cambio(self, anterior, nuevo, motivo):
+        evento = {
+            'frame': self._frame,
+            'instante': time.time(),
+            'de': anterior,
+            'a': nuevo,
+            'motivo': motivo,
+            'latencia_media_ms': self.latencia_media,
+        }
+        self.historial.append(evento)
+        print(f"🔧 Resolución {anterior} -> {nuevo} ({motivo})")
+
+    def _requiere_refuerzo(self, detecciones, forma_frame):
+        """Hay objetos pequeños, lejanos o de clases pequeñas"""
+        area_frame = forma_frame[0] * forma_frame[1] if forma_frame else None
+
+        for det in detecciones:
+            if det.get('clase') in self.clases_pequenas:
+                return f"clase pequeña: {det['clase']}"
+
+            distancia = det.get('distancia')
+            if distancia is not None and distancia > self.distancia_lejana:
+                return f"objeto lejano: {det.get('clase')} a {distancia:.1f} m"
+
+            if area_frame and 'bbox' in det:
+                x1, y1, x2, y2 = det['bbox']
+                if (x2 - x1) * (y2 - y1) / area_frame < self.area_pequena:
+                    return f"objeto pequeño: {det.get('clase')}"
+
+        return None
+
+    def registrar(self, latencia_ms, detecciones=(), forma_frame=None):
+        """
+        Actualiza el controlador con la última inferencia
+
+        Args:
+            latencia_ms: Latencia medida de la inferencia
+            detecciones: Registros con 'clase', 'bbox' y opcionalmente
+                         'distancia' (ver SistemaVisionEstereo.extraer_detecciones)
+            forma_frame: (alto, ancho) del frame original
+
+        Returns:
+            int: imgsz para la próxima inferencia
+        """
+        self._frame += 1
+        usado = self.imgsz
+
+        # Normalizar la latencia al nivel base (el coste escala con los píxeles)
+        base = self.tamanos[self.nivel]
+        latencia_base = latencia_ms * (base / usado) ** 2
+        if self.latencia_media is None:
+            self.latencia_media = latencia_base
+        else:
+            self.latencia_media += self.suavizado * (latencia_base - self.latencia_media)
+
+        # Ajuste del nivel base con histéresis
+        bajar = self.latencia_media > self.objetivo * (1 + self.margen) and self.nivel > 0
+        subir = False
+        if self.nivel < len(self.tamanos) - 1:
+            siguiente = self.tamanos[self.nivel + 1]
+            estimada = self.latencia_media * (siguiente / base) ** 2
+            subir = estimada < self.objetivo * (1 - self.margen)
+
+        if bajar or subir:
+            self._fuera_de_margen += 1
+        else:
+            self._fuera_de_margen = 0
+
+        if self._fuera_de_margen >= self.frames_estables:
+            nuevo_nivel = self.nivel - 1 if bajar else self.nivel + 1
+            escala = (self.tamanos[nuevo_nivel] / base) ** 2
+            self._registrar_cambio(
+                base, self.tamanos[nuevo_nivel],
+                f"latencia {self.latencia_media:.0f} ms, objetivo {self.objetivo:.0f} ms"
+            )
+            self.nivel = nuevo_nivel
+            self.latencia_media *= escala
+            self._fuera_de_margen = 0
+
+        # Refuerzo temporal por objetos pequeños o lejanos
+        motivo = self._requiere_refuerzo(detecciones, forma_frame)
+        if motivo:
+            if self.refuerzo == 0 and self.nivel < len(self.tamanos) - 1:
+                self._registrar_cambio(self.imgsz, self.tamanos[self.nivel + 1],
+                                       f"refuerzo, {motivo}")
+            self.refuerzo = self.frames_refuerzo
+        elif self.refuerzo > 0:
+            self.refuerzo -= 1
+            if self.refuerzo == 0 and self.nivel < len(self.tamanos) - 1:
+                self._registrar_cambio(self.tamanos[self.nivel + 1], self.imgsz,
+                                       "fin del refuerzo")
+
+        return self.imgsz
@@ -0,0 +1,253 @@
+"""
+Selección de Modelo por Precisión y Latencia
+
+Recorre todos los results/*/weights/best.pt y, para cada uno:
+1. Valida el modelo a varios tamaños de entrada (mAP50, mAP50-95)
+2. Mide latencia y throughput en CPU a varios tamaños y batch sizes
+3. Calcula el frente de Pareto precisión/latencia
+4. Recomienda pesos y tamaño de entrada para un presupuesto de latencia
+
+Uso:
+    python seleccion_modelo.py --presupuesto-ms 150
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import yaml
+from ultralytics import YOLO
+
+from train import DATA_YAML, RESULTS_DIR, validate_model
+
+SELECCION_DIR = RESULTS_DIR / "seleccion_modelo"
+
+def buscar_pesos(results_dir=RESULTS_DIR):
+    """
+    Devuelve todos los best.pt de los experimentos en results/
+    """
+    return sorted(Path(results_dir).glob("*/weights/best.pt"))
+
+def medir_latencia(model_path, img_size=640, batch_size=1, repeticiones=20, calentamiento=3):
+    """
+    Mide la latencia de inferencia en CPU con imágenes sintéticas
+
+    Args:
+        model_path: Ruta a los pesos (o modelo YOLO ya cargado)
+        img_size: Tamaño de entrada
+        batch_size: Imágenes por llamada al modelo
+        repeticiones: Llamadas cronometradas
+        calentamiento: Llamadas previas no cronometradas
+
+    Returns:
+        dict: latencia mediana y p90 por llamada (ms) e imágenes/s
+    """
+    model = YOLO(str(model_path)) if not isinstance(model_path, YOLO) else model_path
+
+    rng = np.random.default_rng(0)
+    frames = [
+        rng.integers(0, 255, (img_size, img_size, 3), dtype=np.uint8)
+        for _ in range(batch_size)
+    ]
+
+    for _ in range(calentamiento):
+        model(frames, imgsz=img_size, device='cpu', verbose=False)
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        model(frames, imgsz=img_size, device='cpu', verbose=False)
+        tiempos.append(time.perf_counter() - inicio)
+
+    mediana = float(np.median(tiempos))
+    return {
+        'latencia_ms': mediana * 1000,
+        'latencia_p90_ms': float(np.percentile(tiempos, 90)) * 1000,
+        'imagenes_por_s': batch_size / mediana,
+    }
+
+def frente_pareto(puntos):
+    """
+    Filtra los puntos no dominados (mayor mAP50-95 y menor latencia)
+
+    Args:
+        puntos: Lista de dicts con 'map50_95' y 'latencia_ms'
+
+    Returns:
+        list: Puntos del frente ordenados por latencia
+    """
+    frente = []
+    mejor_map = -1.0
+    for punto in sorted(puntos, key=lambda p: (p['latencia_ms'], -p['map50_95'])):
+        if punto['map50_95'] > mejor_map:
+            frente.append(punto)
+            mejor_map = punto['map50_95']
+    return frente
+
+def recomendar(puntos, presupuesto_ms):
+    """
+    Elige el punto con mayor mAP50-95 dentro del presupuesto de latencia
+
+    Returns:
+        dict o None si ningún modelo cumple el presupuesto
+    """
+    candidatos = [p for p in puntos if p['latencia_ms'] <= presupuesto_ms]
+    if not candidatos:
+        return None
+    return max(candidatos, key=lambda p: (p['map50_95'], -p['latencia_ms']))
+
+def seleccionar_modelo(
+    presupuesto_ms=150,
+    tamanos=(320, 416, 512, 640),
+    batch_sizes=(1, 4),
+    repeticiones=20
+):
+    """
+    Valida y mide todos los modelos entrenados y escribe el reporte
+
+    Args:
+        presupuesto_ms: Latencia máxima por frame (batch 1) en milisegundos
+        tamanos: Tamaños de entrada a evaluar
+        batch_sizes: Batch sizes para el benchmark de throughput
+        repeticiones: Llamadas cronometradas por medición
+
+    Returns:
+        dict: Reporte con mediciones, frente de Pareto y recomendación
+    """
+    pesos = buscar_pesos()
+    if not pesos:
+        print(f"❌ No se encontraron modelos en {RESULTS_DIR}/*/weights/best.pt")
+        return None
+
+    print(f"\n{'='*60}")
+    print(f"⚖️  Selección de modelo: {len(pesos)} candidatos")
+    print(f"{'='*60}")
+
+    with open(DATA_YAML) as f:
+        nc = yaml.safe_load(f)['nc']
+
+    mediciones = []
+    for model_path in pesos:
+        experimento = model_path.parent.parent.name
+        model = YOLO(str(model_path))
+        if len(model.names) != nc:
+            print(f"⚠️  {experimento}: {len(model.names)} clases, data.yaml tiene {nc}; se omite")
+            continue
+
+        for img_size in tamanos:
+            metrics = validate_model(
+                str(model_path),
+                experiment_name=f"seleccion_modelo/val_{experimento}_{img_size}",
+                img_size=img_size
+            )
+
+            punto = {
+                'experimento': experimento,
+                'pesos': str(model_path),
+                'img_size': img_size,
+                'map50': float(metrics.box.map50),
+                'map50_95': float(metrics.box.map),
+                'throughput': {},
+            }
+
+            for batch_size in batch_sizes:
+                bench = medir_latencia(model, img_size, batch_size, repeticiones)
+                punto['throughput'][batch_size] = bench
+                if batch_size == 1:
+                    punto['latencia_ms'] = bench['latencia_ms']
+                    punto['latencia_p90_ms'] = bench['latencia_p90_ms']
+
+            if 'latencia_ms' not in punto:
+                punto.update(medir_latencia(model, img_size, 1, repeticiones))
+
+            print(f"   {experimento} @ {img_size}: mAP50-95 {punto['map50_95']:.4f} | "
+                  f"{punto['latencia_ms']:.1f} ms")
+            mediciones.append(punto)
+
+    frente = frente_pareto(mediciones)
+    recomendacion = recomendar(mediciones, presupuesto_ms)
+
+    reporte = {
+        'presupuesto_ms': presupuesto_ms,
+        'mediciones': mediciones,
+        'frente_pareto': frente,
+        'recomendacion': recomendacion,
+    }
+
+    SELECCION_DIR.mkdir(parents=True, exist_ok=True)
+    (SELECCION_DIR / "reporte.json").write_text(json.dumps(reporte, indent=2))
+    (SELECCION_DIR / "reporte.md").write_text(_reporte_markdown(reporte, batch_sizes))
+
+    print(f"\n📈 Frente de Pareto:")
+    for p in frente:
+        print(f"   - {p['experimento']} @ {p['img_size']}: "
+              f"mAP50-95 {p['map50_95']:.4f} | {p['latencia_ms']:.1f} ms")
+
+    if recomendacion:
+        print(f"\n🏆 Recomendado para {presupuesto_ms} ms: {recomendacion['pesos']} "
+              f"(imgsz={recomendacion['img_size']}, "
+              f"mAP50-95 {recomendacion['map50_95']:.4f}, "
+              f"{recomendacion['latencia_ms']:.1f} ms)")
+    else:
+        print(f"\n⚠️  Ningún modelo cumple el presupuesto de {presupuesto_ms} ms")
+
+    print(f"📁 Reporte guardado en: {SELECCION_DIR}")
+
+    return reporte
+
+def _reporte_markdown(reporte, batch_sizes):
+    """
+    Genera la tabla del reporte en Markdown
+    """
+    frente = {(p['pesos'], p['img_size']) for p in reporte['frente_pareto']}
+    columnas_batch = " | ".join(f"img/s (batch {b})" for b in batch_sizes)
+
+    lineas = [
+        "# Selección de Modelo: Precisión vs Latencia (CPU)",
+        "",
+        f"| Experimento | imgsz | mAP50 | mAP50-95 | Latencia (ms) | p90 (ms) | {columnas_batch} | Pareto |",
+        "|" + "---|" * (7 + len(batch_sizes)),
+    ]
+    for p in sorted(reporte['mediciones'], key=lambda p: p['latencia_ms']):
+        throughput = " | ".join(
+            f"{p['throughput'][b]['imagenes_por_s']:.1f}" for b in batch_sizes
+        )
+        marca = "✅" if (p['pesos'], p['img_size']) in frente else ""
+        lineas.append(
+            f"| {p['experimento']} | {p['img_size']} | {p['map50']:.4f} | "
+            f"{p['map50_95']:.4f} | {p['latencia_ms']:.1f} | "
+            f"{p['latencia_p90_ms']:.1f} | {throughput} | {marca} |"
+        )
+
+    lineas.append("")
+    rec = reporte['recomendacion']
+    if rec:
+        lineas.append(
+            f"**Recomendación ({reporte['presupuesto_ms']} ms):** `{rec['pesos']}` "
+            f"con imgsz={rec['img_size']}"
+        )
+    else:
+        lineas.append(
+            f"**Recomendación:** ningún modelo cumple {reporte['presupuesto_ms']} ms"
+        )
+    return "\n".join(lineas) + "\n"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Selección de modelo por precisión y latencia")
+    parser.add_argument("--presupuesto-ms", type=float, default=150,
+                        help="Latencia máxima por frame en CPU (ms)")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[320, 416, 512, 640],
+                        help="Tamaños de entrada a evaluar")
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 4],
+                        help="Batch sizes para el benchmark")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    seleccionar_modelo(
+        presupuesto_ms=args.presupuesto_ms,
+        tamanos=args.tamanos,
+        batch_sizes=args.batches,
+        repeticiones=args.repeticiones,
+    )
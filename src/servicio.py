@@ -0,0 +1,318 @@
+"""
+Servicio de Detección y Distancia (asyncio + HTTP)
+
+Permite que clientes móviles envíen frames a un equipo cercano en lugar
+de conectar las cámaras por USB:
+
+    POST /detectar          cuerpo: JPEG (mono, sin distancia)
+    POST /detectar_estereo  cuerpo: JPEG izquierdo + JPEG derecho,
+                            cabecera X-Longitud-Izquierda con los bytes
+                            del primero
+    GET  /estado            estadísticas del servicio
+
+La cabecera X-Cliente identifica al cliente (por defecto, su dirección IP;
+en socket Unix, cada conexión es un cliente distinto).
+Respuesta JSON: {"detecciones": [...], "latencia_ms": ..., "descartado": false}
+
+- La inferencia corre en un executor, sin bloquear el bucle de eventos
+- Concurrencia limitada: un SistemaVisionEstereo (con su modelo) por
+  trabajador, entregados a través de una cola
+- Contrapresión por cliente: si llega un frame nuevo mientras el anterior
+  del mismo cliente sigue esperando trabajador, el anterior se descarta
+  (se responde con "descartado": true)
+
+Uso:
+    python servicio.py --modelo ../results/exp1_base/weights/best.pt --puerto 8080
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from detect import SistemaVisionEstereo
+
+MAX_CUERPO = 10 * 1024 * 1024  # 10 MB por petición
+
+ESTADOS_HTTP = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+class ServicioDeteccion:
+    """
+    Envuelve SistemaVisionEstereo en un servicio asyncio
+    """
+
+    def __init__(self, model_path, focal_length=700, baseline=0.06, max_concurrencia=1, conf=0.5):
+        """
+        Args:
+            model_path: Ruta al modelo YOLO entrenado
+            focal_length: Distancia focal de las cámaras (píxeles)
+            baseline: Separación entre cámaras (metros)
+            max_concurrencia: Inferencias simultáneas (un modelo por trabajador)
+            conf: Umbral de confianza (el mismo que DetectorSimple)
+        """
+        self.model_path = model_path
+        self.focal_length = focal_length
+        self.baseline = baseline
+        self.max_concurrencia = max_concurrencia
+        self.conf = conf
+
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrencia)
+        self.sistemas = None
+        self.pendientes = {}
+        self._conexiones = itertools.count()
+
+        # Estadísticas
+        self.atendidas = 0
+        self.descartadas = 0
+        self.latencias = []
+
+    async def iniciar(self):
+        """Carga los modelos de los trabajadores en el executor"""
+        loop = asyncio.get_running_loop()
+        self.sistemas = asyncio.Queue()
+        for _ in range(self.max_concurrencia):
+            sistema = await loop.run_in_executor(
+                self.executor,
+                lambda: SistemaVisionEstereo(
+                    self.model_path, self.focal_length, self.baseline,
+                    voz=False, alarma=False
+                )
+            )
+            self.sistemas.put_nowait(sistema)
+
+    def _inferir(self, sistema, jpeg_left, jpeg_right=None):
+        """
+        Decodifica, detecta y calcula distancias (corre en el executor)
+        """
+        # cv2.imdecode lanza cv2.error (no devuelve None) con un buffer vacío
+        if not jpeg_left or (jpeg_right is not None and not jpeg_right):
+            raise ValueError("Frame vacío")
+        frame_left = cv2.imdecode(np.frombuffer(jpeg_left, np.uint8), cv2.IMREAD_COLOR)
+        if frame_left is None:
+            raise ValueError("JPEG izquierdo inválido")
+
+        disparity_map = None
+        if jpeg_right is not None:
+            frame_right = cv2.imdecode(np.frombuffer(jpeg_right, np.uint8), cv2.IMREAD_COLOR)
+            if frame_right is None:
+                raise ValueError("JPEG derecho inválido")
+            if frame_right.shape != frame_left.shape:
+                raise ValueError(f"Los frames izquierdo {frame_left.shape[:2]} y "
+                                 f"derecho {frame_right.shape[:2]} tienen distinto tamaño")
+            disparity_map = sistema.calcular_mapa_disparidad(frame_left, frame_right)
+
+        results = sistema.model(frame_left, verbose=False, conf=self.conf)
+        detecciones = sistema.extraer_detecciones(results, disparity_map)
+
+        return [
+            {
+                'clase': d['clase'],
+                'confianza': round(d['confianza'], 4),
+                'bbox': list(d['bbox']),
+                'distancia_m': round(d['distancia'], 3) if d['distancia'] is not None else None,
+                'posicion_m': [round(c, 3) for c in d['posicion']] if d['posicion'] else None,
+                'direccion': d['direccion'],
+            }
+            for d in detecciones
+        ]
+
+    async def detectar(self, cliente, jpeg_left, jpeg_right=None):
+        """
+        Atiende un frame aplicando contrapresión por cliente
+
+        Returns:
+            dict: respuesta JSON
+        """
+        inicio = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        # Descartar el frame anterior del cliente si aún no empezó
+        anterior = self.pendientes.get(cliente)
+        if anterior is not None and not anterior.done():
+            anterior.set_result(True)
+        descartado = loop.create_future()
+        self.pendientes[cliente] = descartado
+
+        obtener = asyncio.ensure_future(self.sistemas.get())
+        await asyncio.wait({descartado, obtener}, return_when=asyncio.FIRST_COMPLETED)
+
+        if descartado.done():
+            if obtener.done():
+                self.sistemas.put_nowait(obtener.result())
+            else:
+                obtener.cancel()
+            self.descartadas += 1
+            return {'detecciones': [], 'descartado': True,
+                    'latencia_ms': (time.perf_counter() - inicio) * 1000}
+
+        sistema = obtener.result()
+        descartado.set_result(False)
+        if self.pendientes.get(cliente) is descartado:
+            del self.pendientes[cliente]
+
+        try:
+            detecciones = await loop.run_in_executor(
+                self.executor, self._inferir, sistema, jpeg_left, jpeg_right
+            )
+        finally:
+            self.sistemas.put_nowait(sistema)
+
+        latencia = (time.perf_counter() - inicio) * 1000
+        self.atendidas += 1
+        self.latencias.append(latencia)
+        del self.latencias[:-1000]
+
+        return {'detecciones': detecciones, 'descartado': False, 'latencia_ms': latencia}
+
+    def estado(self):
+        latencias = sorted(self.latencias)
+        p50 = latencias[len(latencias) // 2] if latencias else None
+        return {
+            'atendidas': self.atendidas,
+            'descartadas': self.descartadas,
+            'clientes_en_espera': sum(1 for f in self.pendientes.values() if not f.done()),
+            'latencia_p50_ms': p50,
+        }
+
+    async def _leer_peticion(self, reader):
+        """
+        Lee una petición HTTP/1.1 (línea, cabeceras y cuerpo)
+
+        Returns:
+            tuple: (metodo, ruta, cabeceras, cuerpo) o None si se cerró
+        """
+        linea = await reader.readline()
+        if not linea:
+            return None
+
+        metodo, ruta, _ = linea.decode('latin-1').split(' ', 2)
+        cabeceras = {}
+        while True:
+            linea = await reader.readline()
+            if linea in (b'\r\n', b'\n', b''):
+                break
+            nombre, _, valor = linea.decode('latin-1').partition(':')
+            cabeceras[nombre.strip().lower()] = valor.strip()
+
+        longitud = int(cabeceras.get('content-length', 0))
+        if longitud > MAX_CUERPO:
+            raise OverflowError(longitud)
+        cuerpo = await reader.readexactly(longitud) if longitud else b''
+
+        return metodo, ruta, cabeceras, cuerpo
+
+    async def _responder(self, writer, codigo, datos, mantener):
+        cuerpo = json.dumps(datos).encode()
+        writer.write(
+            f"HTTP/1.1 {codigo} {ESTADOS_HTTP[codigo]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(cuerpo)}\r\n"
+            f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n".encode()
+            + cuerpo
+        )
+        await writer.drain()
+
+    async def atender_conexion(self, reader, writer):
+        """Atiende peticiones de una conexión (keep-alive)"""
+        peer = writer.get_extra_info('peername')
+        if isinstance(peer, tuple):
+            cliente_defecto = str(peer[0])
+        else:
+            # Socket Unix: sin dirección, cada conexión es su propio cliente
+            cliente_defecto = f"local-{next(self._conexiones)}"
+
+        try:
+            while True:
+                try:
+                    peticion = await self._leer_peticion(reader)
+                except OverflowError:
+                    await self._responder(writer, 413, {'error': 'cuerpo demasiado grande'}, False)
+                    break
+                except (ValueError, asyncio.IncompleteReadError):
+                    await self._responder(writer, 400, {'error': 'petición inválida'}, False)
+                    break
+
+                if peticion is None:
+                    break
+
+                metodo, ruta, cabeceras, cuerpo = peticion
+                mantener = cabeceras.get('connection', '').lower() != 'close'
+                cliente = cabeceras.get('x-cliente', cliente_defecto)
+
+                try:
+                    if metodo == 'GET' and ruta == '/estado':
+                        codigo, datos = 200, self.estado()
+                    elif metodo == 'POST' and ruta == '/detectar':
+                        codigo, datos = 200, await self.detectar(cliente, cuerpo)
+                    elif metodo == 'POST' and ruta == '/detectar_estereo':
+                        n = int(cabeceras['x-longitud-izquierda'])
+                        if not 0 < n < len(cuerpo):
+                            raise ValueError(f"X-Longitud-Izquierda={n} fuera del cuerpo "
+                                             f"({len(cuerpo)} bytes)")
+                        codigo, datos = 200, await self.detectar(cliente, cuerpo[:n], cuerpo[n:])
+                    else:
+                        codigo, datos = 404, {'error': f'ruta desconocida: {metodo} {ruta}'}
+                except (KeyError, ValueError) as e:
+                    codigo, datos = 400, {'error': str(e)}
+                except Exception as e:
+                    print(f"❌ Error atendiendo {metodo} {ruta} ({cliente}): {e!r}")
+                    codigo, datos = 500, {'error': f'error interno: {e}'}
+
+                await self._responder(writer, codigo, datos, mantener)
+                if not mantener:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def servir(self, host='0.0.0.0', puerto=8080, unix=None):
+        """
+        Inicia el servidor TCP (o socket Unix si se indica `unix`)
+        """
+        print("🚀 Cargando modelos del servicio...")
+        await self.iniciar()
+
+        if unix:
+            server = await asyncio.start_unix_server(self.atender_conexion, path=unix)
+            print(f"✅ Servicio activo en unix:{unix}")
+        else:
+            server = await asyncio.start_server(self.atender_conexion, host, puerto)
+            print(f"✅ Servicio activo en http://{host}:{puerto}")
+
+        async with server:
+            await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio de detección y distancia")
+    parser.add_argument("--modelo", default="../results/exp1_base/weights/best.pt")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--unix", default=None, help="Ruta de socket Unix (en lugar de TCP)")
+    parser.add_argument("--concurrencia", type=int, default=1,
+                        help="Inferencias simultáneas (un modelo por trabajador)")
+    parser.add_argument("--focal", type=float, default=700)
+    parser.add_argument("--baseline", type=float, default=0.06)
+    args = parser.parse_args()
+
+    servicio = ServicioDeteccion(
+        args.modelo,
+        focal_length=args.focal,
+        baseline=args.baseline,
+        max_concurrencia=args.concurrencia,
+    )
+    try:
+        asyncio.run(servicio.servir(args.host, args.puerto, args.unix))
+    except KeyboardInterrupt:
+        print("\n👋 Servicio detenido")
@@ -0,0 +1,385 @@
+"""
+Subconjunto de Clases y Poda Estructurada del Detector
+
+Genera un modelo más pequeño y rápido para un despliegue que solo necesita
+parte de las 31 clases de data.yaml (p. ej. obstáculos de navegación, sin
+'salon A' ni 'edificio L'):
+1. Dataset derivado con las etiquetas reindexadas al subconjunto
+2. Cabeza de detección reconstruida solo con las clases elegidas
+3. Poda estructurada de canales en las ramas de la cabeza, según la
+   magnitud de los pesos de BatchNorm (network slimming)
+4. Fine-tune corto, validación por clase antes/después, latencia en CPU
+   y mapa de clases para los scripts de ejecución
+
+Uso:
+    python subconjunto_clases.py --pesos ../results/exp1_base/weights/best.pt \\
+        --nombre navegacion --poda 0.5 --epocas 10
+"""
+
+import argparse
+import json
+import os
+import shutil
+from copy import deepcopy
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+import yaml
+from ultralytics import YOLO
+from ultralytics.models.yolo.detect import DetectionTrainer
+
+from train import DATA_YAML, MODELS_DIR, PROJECT_ROOT, RESULTS_DIR, obtener_dispositivo
+from seleccion_modelo import medir_latencia
+
+# Clases relevantes para la navegación (sin edificios ni salones)
+CLASES_NAVEGACION = [
+    'arbol', 'arbusto', 'bancas', 'banqueta', 'basureso', 'escaleras',
+    'jardinera', 'letrero', 'moto', 'pared', 'pero', 'persona', 'pilar',
+    'poste de luz', 'rampa', 'sillas', 'tronco',
+]
+
+SUBCONJUNTOS_DIR = PROJECT_ROOT / "data_subconjuntos"
+# Fuera de results/*/weights/best.pt: seleccion_modelo.py valida esos pesos
+# con las 31 clases de data.yaml
+SUBCONJUNTOS_RESULTS = RESULTS_DIR / "subconjuntos"
+
+def crear_dataset_subconjunto(clases, nombre):
+    """
+    Crea un dataset con las etiquetas reindexadas al subconjunto
+
+    Las imágenes se enlazan (o copian si no se permiten enlaces) y las
+    etiquetas de clases fuera del subconjunto se eliminan; las imágenes
+    sin objetos quedan como fondo.
+
+    Returns:
+        tuple: (ruta del data.yaml derivado, {id_original: id_nuevo})
+    """
+    with open(DATA_YAML) as f:
+        data = yaml.safe_load(f)
+
+    nombres = data['names']
+    faltantes = [c for c in clases if c not in nombres]
+    if faltantes:
+        raise ValueError(f"Clases desconocidas: {faltantes}. Disponibles: {nombres}")
+
+    remapeo = {nombres.index(c): i for i, c in enumerate(clases)}
+    base = Path(data.get('path', PROJECT_ROOT))
+    if not base.is_absolute():
+        base = PROJECT_ROOT / base
+    destino = SUBCONJUNTOS_DIR / nombre
+
+    print(f"\n📂 Creando dataset '{nombre}' con {len(clases)} clases...")
+
+    for split in ('train', 'val', 'test'):
+        if split not in data:
+            continue
+
+        img_dir = base / data[split]
+        label_dir = Path(str(img_dir).replace(f"{os.sep}images", f"{os.sep}labels"))
+        img_dest = destino / 'images' / split
+        label_dest = destino / 'labels' / split
+        img_dest.mkdir(parents=True, exist_ok=True)
+        label_dest.mkdir(parents=True, exist_ok=True)
+
+        objetos = 0
+        for img in img_dir.glob('*'):
+            if img.suffix.lower() not in ('.jpg', '.jpeg', '.png', '.bmp'):
+                continue
+
+            enlace = img_dest / img.name
+            if not enlace.exists():
+                try:
+                    enlace.symlink_to(img.resolve())
+                except OSError:
+                    shutil.copy2(img, enlace)
+
+            lineas = []
+            label = label_dir / f"{img.stem}.txt"
+            if label.exists():
+                for linea in label.read_text().splitlines():
+                    partes = linea.split()
+                    if len(partes) >= 5 and int(partes[0]) in remapeo:
+                        lineas.append(" ".join([str(remapeo[int(partes[0])])] + partes[1:]))
+            (label_dest / f"{img.stem}.txt").write_text("\n".join(lineas))
+            objetos += len(lineas)
+
+        print(f"   {split}: {objetos} objetos del subconjunto")
+
+    data_yaml = destino / "data.yaml"
+    with open(data_yaml, 'w') as f:
+        yaml.safe_dump({
+            'path': str(destino.resolve()),
+            'train': 'images/train',
+            'val': 'images/val',
+            'test': 'images/test',
+            'nc': len(clases),
+            'names': list(clases),
+        }, f, allow_unicode=True, sort_keys=False)
+
+    return data_yaml, remapeo
+
+def _metricas_por_clase(metrics, nombres):
+    """
+    {clase: {precision, recall, map50, map50_95}} de una validación
+    """
+    resultado = {}
+    for i, clase_id in enumerate(metrics.box.ap_class_index):
+        p, r, map50, map50_95 = metrics.box.class_result(i)
+        resultado[nombres[int(clase_id)]] = {
+            'precision': float(p),
+            'recall': float(r),
+            'map50': float(map50),
+            'map50_95': float(map50_95),
+        }
+    return resultado
+
+def recortar_cabeza(model, indices):
+    """
+    Reconstruye la cabeza de detección solo para las clases `indices`
+
+    Conserva las filas de la última convolución de cada rama de clases,
+    así que el modelo detecta esas clases sin reentrenar.
+    """
+    detect = model.model[-1]
+    indices = torch.as_tensor(indices, dtype=torch.long)
+
+    for rama in detect.cv3:
+        final = rama[-1]
+        nueva = nn.Conv2d(final.in_channels, len(indices), 1, bias=final.bias is not None)
+        nueva.weight.data = final.weight.data[indices].clone()
+        if final.bias is not None:
+            nueva.bias.data = final.bias.data[indices].clone()
+        rama[-1] = nueva
+
+    detect.nc = len(indices)
+    detect.no = detect.nc + detect.reg_max * 4
+    model.nc = detect.nc
+    model.yaml['nc'] = detect.nc
+
+def _podar_conv(conv_bloque, mantener_salida, mantener_entrada=None):
+    """
+    Recorta canales de un bloque Conv (Conv2d + BatchNorm2d) de ultralytics
+    """
+    conv, bn = conv_bloque.conv, conv_bloque.bn
+    peso = conv.weight.data[mantener_salida]
+    if mantener_entrada is not None:
+        peso = peso[:, mantener_entrada]
+
+    nueva = nn.Conv2d(
+        peso.shape[1], peso.shape[0], conv.kernel_size, conv.stride,
+        conv.padding, conv.dilation, groups=1, bias=False
+    )
+    nueva.weight.data = peso.clone()
+    conv_bloque.conv = nueva
+
+    nuevo_bn = nn.BatchNorm2d(len(mantener_salida), eps=bn.eps, momentum=bn.momentum)
+    for atributo in ('weight', 'bias', 'running_mean', 'running_var'):
+        getattr(nuevo_bn, atributo).data = getattr(bn, atributo).data[mantener_salida].clone()
+    conv_bloque.bn = nuevo_bn
+
+def _canales_a_mantener(bn, proporcion):
+    n = max(8, int(round(bn.num_features * (1 - proporcion))))
+    return torch.argsort(bn.weight.data.abs(), descending=True)[:n].sort().values
+
+def podar_cabeza(model, proporcion=0.5):
+    """
+    Poda estructurada de los canales intermedios de las ramas de la cabeza
+
+    Cada rama (caja o clase) es Conv -> Conv -> Conv2d; se eliminan los
+    canales con menor |gamma| de BatchNorm en las dos primeras
+    convoluciones y la entrada correspondiente de la siguiente. Las ramas
+    no dependen de otras capas, así que la poda no requiere analizar el
+    grafo de la red. La salida de la red troncal no se modifica.
+
+    Returns:
+        int: Ramas podadas
+    """
+    detect = model.model[-1]
+    podadas = 0
+
+    for rama in list(detect.cv2) + list(detect.cv3):
+        if len(rama) != 3 or any(getattr(rama[i], 'conv', None) is None or
+                                 getattr(rama[i].conv, 'groups', 1) != 1 for i in (0, 1)):
+            print("⚠️  Estructura de cabeza no soportada para poda, se omite la rama")
+            continue
+
+        primero = _canales_a_mantener(rama[0].bn, proporcion)
+        _podar_conv(rama[0], primero)
+
+        segundo = _canales_a_mantener(rama[1].bn, proporcion)
+        _podar_conv(rama[1], segundo, primero)
+
+        final = rama[2]
+        nueva = nn.Conv2d(len(segundo), final.out_channels, 1, bias=final.bias is not None)
+        nueva.weight.data = final.weight.data[:, segundo].clone()
+        if final.bias is not None:
+            nueva.bias.data = final.bias.data.clone()
+        rama[2] = nueva
+        podadas += 1
+
+    return podadas
+
+def _contar_parametros(model):
+    return sum(p.numel() for p in model.parameters())
+
+class _EntrenadorPodado(DetectionTrainer):
+    """
+    Fine-tune sobre el modelo podado tal cual (sin reconstruirlo desde el
+    YAML de la arquitectura original)
+    """
+
+    def get_model(self, cfg=None, weights=None, verbose=True):
+        return weights
+
+def crear_modelo_subconjunto(
+    pesos,
+    clases=CLASES_NAVEGACION,
+    nombre='navegacion',
+    proporcion_poda=0.5,
+    epocas=10,
+    img_size=640,
+    batch_size=16
+):
+    """
+    Genera el modelo reducido, lo afina y compara antes/después
+
+    Args:
+        pesos: Pesos entrenados con las 31 clases
+        clases: Nombres de las clases a conservar
+        nombre: Nombre del despliegue (dataset, experimento y modelo)
+        proporcion_poda: Fracción de canales a eliminar en la cabeza
+        epocas: Épocas de fine-tune
+        img_size: Tamaño de entrada
+        batch_size: Tamaño del batch
+
+    Returns:
+        dict: Reporte con métricas por clase, parámetros y latencia
+    """
+    print(f"\n{'='*60}")
+    print(f"✂️  Subconjunto '{nombre}': {len(clases)} clases, poda {proporcion_poda*100:.0f}%")
+    print(f"{'='*60}")
+
+    data_yaml, remapeo = crear_dataset_subconjunto(clases, nombre)
+    salida = SUBCONJUNTOS_RESULTS / nombre
+
+    # Copia para podar antes de validar: val() fusiona Conv+BN en el
+    # modelo original y elimina los BatchNorm que usa la poda
+    original = YOLO(str(pesos))
+    modelo = deepcopy(original.model).float()
+
+    # Precisión por clase del modelo original
+    metrics_antes = original.val(data=str(DATA_YAML), imgsz=img_size,
+                                 project=str(salida), name="val_original", exist_ok=True)
+    por_clase_antes = _metricas_por_clase(metrics_antes, original.names)
+
+    # Reconstruir la cabeza y podar
+    parametros_antes = _contar_parametros(modelo)
+    recortar_cabeza(modelo, sorted(remapeo, key=remapeo.get))
+    modelo.names = {i: c for i, c in enumerate(clases)}
+    ramas = podar_cabeza(modelo, proporcion_poda)
+    parametros_despues = _contar_parametros(modelo)
+    print(f"🔧 Cabeza: {len(clases)} clases, {ramas} ramas podadas, "
+          f"parámetros {parametros_antes:,} -> {parametros_despues:,}")
+
+    salida.mkdir(parents=True, exist_ok=True)
+    podado_path = salida / "podado.pt"
+    torch.save({
+        'model': modelo.half(),
+        'train_args': {**original.overrides, 'data': str(data_yaml)},
+        'epoch': -1,
+    }, podado_path)
+
+    # Fine-tune corto
+    podado = YOLO(str(podado_path))
+    podado.train(
+        trainer=_EntrenadorPodado,
+        data=str(data_yaml),
+        epochs=epocas,
+        imgsz=img_size,
+        batch=batch_size,
+        lr0=0.001,
+        warmup_epochs=0,
+        device=obtener_dispositivo(),
+        project=str(salida),
+        name="finetune",
+        exist_ok=True,
+        plots=False,
+    )
+
+    final_path = salida / "finetune" / "weights" / "best.pt"
+    final = YOLO(str(final_path))
+    metrics_despues = final.val(data=str(data_yaml), imgsz=img_size,
+                                project=str(salida), name="val_subconjunto", exist_ok=True)
+    por_clase_despues = _metricas_por_clase(metrics_despues, final.names)
+
+    # Modelo y mapa de clases para los scripts de ejecución
+    MODELS_DIR.mkdir(exist_ok=True)
+    modelo_destino = MODELS_DIR / f"{nombre}.pt"
+    shutil.copy2(final_path, modelo_destino)
+    mapa_clases = {
+        'modelo': str(modelo_destino),
+        'clases': {i: {'nombre': clases[i], 'id_original': orig}
+                   for orig, i in sorted(remapeo.items(), key=lambda kv: kv[1])},
+    }
+    mapa_path = MODELS_DIR / f"{nombre}_clases.json"
+    mapa_path.write_text(json.dumps(mapa_clases, indent=2, ensure_ascii=False))
+
+    reporte = {
+        'clases': list(clases),
+        'parametros': {'antes': parametros_antes, 'despues': parametros_despues},
+        'tamano_mb': {'antes': Path(pesos).stat().st_size / 2**20,
+                      'despues': modelo_destino.stat().st_size / 2**20},
+        'latencia_cpu': {'antes': medir_latencia(original, img_size),
+                         'despues': medir_latencia(final, img_size)},
+        'por_clase': {c: {'antes': por_clase_antes.get(c), 'despues': por_clase_despues.get(c)}
+                      for c in clases},
+        'map50_95': {'antes_todas_las_clases': float(metrics_antes.box.map),
+                     'despues_subconjunto': float(metrics_despues.box.map)},
+    }
+    reporte_path = salida / "reporte_subconjunto.json"
+    reporte_path.write_text(json.dumps(reporte, indent=2, ensure_ascii=False))
+
+    print(f"\n📊 mAP50-95 por clase (antes -> después):")
+    for clase in clases:
+        antes = por_clase_antes.get(clase)
+        despues = por_clase_despues.get(clase)
+        texto_antes = f"{antes['map50_95']:.4f}" if antes else "  —   "
+        texto_despues = f"{despues['map50_95']:.4f}" if despues else "  —   "
+        aviso = ""
+        if antes and despues and despues['map50_95'] < antes['map50_95'] - 0.02:
+            aviso = "  ⚠️  pérdida de precisión"
+        print(f"   {clase:16} {texto_antes} -> {texto_despues}{aviso}")
+
+    lat = reporte['latencia_cpu']
+    print(f"\n⏱️  Latencia CPU: {lat['antes']['latencia_ms']:.1f} ms -> "
+          f"{lat['despues']['latencia_ms']:.1f} ms")
+    print(f"💾 Tamaño: {reporte['tamano_mb']['antes']:.1f} MB -> "
+          f"{reporte['tamano_mb']['despues']:.1f} MB")
+    print(f"📁 Modelo: {modelo_destino}")
+    print(f"📁 Mapa de clases: {mapa_path}")
+
+    return reporte
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Subconjunto de clases y poda del detector")
+    parser.add_argument("--pesos", default="../results/exp1_base/weights/best.pt")
+    parser.add_argument("--clases", nargs="+", default=CLASES_NAVEGACION,
+                        help="Nombres de las clases a conservar")
+    parser.add_argument("--nombre", default="navegacion")
+    parser.add_argument("--poda", type=float, default=0.5,
+                        help="Fracción de canales a eliminar en la cabeza")
+    parser.add_argument("--epocas", type=int, default=10)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch", type=int, default=16)
+    args = parser.parse_args()
+
+    crear_modelo_subconjunto(
+        args.pesos,
+        clases=args.clases,
+        nombre=args.nombre,
+        proporcion_poda=args.poda,
+        epocas=args.epocas,
+        img_size=args.imgsz,
+        batch_size=args.batch,
+    )
@@ -7,14 +7,28 @@ Descripción: Sistema de detección de objetos usando YOLOv8 con capacidad de
             estimación de distancia mediante visión estéreo (2 cámaras)
 """
 
-from ultralytics import YOLO
-import torch
 import os
+import sys
+import json
+import math
+import time
+from functools import lru_cache, partial
 from pathlib import Path
 
-# Verificar disponibilidad de GPU
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
-print(f"🖥️  Dispositivo de entrenamiento: {device}")
+# ultralytics y torch se importan dentro de las funciones: importar este
+# módulo (p. ej. desde seleccion_modelo.py) no debe cargar PyTorch ni
+# inicializar CUDA
+
+@lru_cache(maxsize=None)
+def obtener_dispositivo():
+    """
+    Verifica disponibilidad de GPU (solo la primera vez que se necesita)
+    """
+    import torch
+    
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    print(f"🖥️  Dispositivo de entrenamiento: {device}")
+    return device
 
 # Configuración de rutas
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -32,7 +46,9 @@ def train_yolo_model(
     batch_size=16,
     img_size=640,
     learning_rate=0.01,
-    experiment_name='exp1'
+    experiment_name='exp1',
+    pesos_iniciales=None,
+    **train_kwargs
 ):
     """
     Entrena un modelo YOLOv8 usando Transfer Learning
@@ -44,6 +60,10 @@ def train_yolo_model(
         img_size: Tamaño de imagen de entrada
         learning_rate: Tasa de aprendizaje
         experiment_name: Nombre del experimento
+        pesos_iniciales: Checkpoint desde el que continuar (por defecto
+                         los pesos pre-entrenados yolov8{model_size}.pt)
+        **train_kwargs: Argumentos extra para model.train() (sobrescriben
+                        los valores por defecto)
     """
     
     print(f"\n{'='*60}")
@@ -55,19 +75,22 @@ def train_yolo_model(
     print(f"   - Batch size: {batch_size}")
     print(f"   - Tamaño imagen: {img_size}")
     print(f"   - Learning rate: {learning_rate}")
+    if pesos_iniciales:
+        print(f"   - Continuando desde: {pesos_iniciales}")
     print(f"{'='*60}\n")
     
-    # Cargar modelo pre-entrenado (Transfer Learning)
-    model = YOLO(f'yolov8{model_size}.pt')
+    from ultralytics import YOLO
     
-    # Entrenar modelo
-    results = model.train(
+    # Cargar modelo pre-entrenado (Transfer Learning) o checkpoint previo
+    model = YOLO(str(pesos_iniciales) if pesos_iniciales else f'yolov8{model_size}.pt')
+    
+    train_args = dict(
         data=str(DATA_YAML),
         epochs=epochs,
         imgsz=img_size,
         batch=batch_size,
         lr0=learning_rate,
-        device=device,
+        device=obtener_dispositivo(),
         project=str(RESULTS_DIR),
         name=experiment_name,
         patience=20,  # Early stopping
@@ -78,23 +101,36 @@ def train_yolo_model(
         workers=4,
         amp=True,  # Automatic Mixed Precision
     )
+    train_args.update(train_kwargs)
+    
+    # Entrenar modelo
+    results = model.train(**train_args)
     
     print(f"\n✅ Entrenamiento completado: {experiment_name}")
     print(f"📁 Resultados guardados en: {RESULTS_DIR / experiment_name}")
     
     return results
 
-def validate_model(model_path, experiment_name='validation'):
+def validate_model(model_path, experiment_name='validation', img_size=None):
     """
     Valida el modelo entrenado
+    
+    Args:
+        model_path: Ruta a los pesos
+        experiment_name: Nombre de la carpeta de validación
+        img_size: Tamaño de entrada (None = el usado en el entrenamiento)
     """
+    from ultralytics import YOLO
+    
     print(f"\n🔍 Validando modelo: {model_path}")
     
     model = YOLO(model_path)
+    val_args = {'imgsz': img_size} if img_size else {}
     metrics = model.val(
         data=str(DATA_YAML),
         project=str(RESULTS_DIR),
-        name=experiment_name
+        name=experiment_name,
+        **val_args
     )
     
     print(f"\n📈 Métricas de Validación:")
@@ -105,8 +141,422 @@ def validate_model(model_path, experiment_name='validation'):
     
     return metrics
 
+def _map_de_resultados(results, save_dir):
+    """
+    Obtiene el mAP50-95 de validación de un entrenamiento
+    
+    Usa las métricas devueltas por model.train() y, si la versión de
+    ultralytics no las devuelve, la última fila de results.csv
+    """
+    if results is not None and hasattr(results, 'box'):
+        return float(results.box.map)
+    
+    csv_path = Path(save_dir) / 'results.csv'
+    if csv_path.exists():
+        lineas = csv_path.read_text().strip().splitlines()
+        columnas = [c.strip() for c in lineas[0].split(',')]
+        ultima = [v.strip() for v in lineas[-1].split(',')]
+        if 'metrics/mAP50-95(B)' in columnas:
+            return float(ultima[columnas.index('metrics/mAP50-95(B)')])
+    
+    return 0.0
+
+def busqueda_successive_halving(
+    configuraciones,
+    epocas_iniciales=3,
+    factor=3,
+    epocas_max=50,
+    presupuesto_epocas=None,
+    nombre_busqueda='busqueda_sh'
+):
+    """
+    Búsqueda de hiperparámetros con Successive Halving
+    
+    Entrena todas las configuraciones unas pocas épocas, descarta la
+    fracción peor según el mAP50-95 de validación y continúa las
+    supervivientes desde su último checkpoint, multiplicando las épocas
+    por `factor` en cada ronda. Cuando queda una sola configuración se
+    entrena hasta `epocas_max` (o hasta agotar el presupuesto), para que
+    el ganador reciba el mismo entrenamiento que en una búsqueda
+    exhaustiva.
+    
+    Cada ronda es un reinicio en caliente: parte de los pesos de last.pt,
+    pero ultralytics crea de nuevo el optimizador y el scheduler del
+    learning rate (sin el momentum acumulado ni la fase de decaimiento
+    de la ronda anterior), así que no equivale a continuar un único
+    entrenamiento.
+    
+    El optimizador se fija en SGD (salvo que la configuración indique
+    'optimizer'): con optimizer='auto' ultralytics ignora lr0 en
+    entrenamientos cortos y elige AdamW con su propio learning rate.
+    
+    Args:
+        configuraciones: Lista de dicts con argumentos de train_yolo_model
+                         (model_size, batch_size, img_size, learning_rate,
+                         optimizer)
+        epocas_iniciales: Épocas de la primera ronda
+        factor: Se conserva 1/factor de las configuraciones en cada ronda
+        epocas_max: Épocas máximas por configuración (las de una búsqueda
+                    exhaustiva)
+        presupuesto_epocas: Total de épocas a repartir entre todas las
+                            configuraciones (None = sin límite)
+        nombre_busqueda: Carpeta dentro de results/ para la búsqueda
+    
+    Returns:
+        dict: Resumen con la mejor configuración, rondas y cómputo ahorrado
+    """
+    print(f"\n{'='*60}")
+    print(f"🔎 Búsqueda Successive Halving: {nombre_busqueda}")
+    print(f"{'='*60}")
+    print(f"   - Configuraciones: {len(configuraciones)}")
+    print(f"   - Épocas iniciales: {epocas_iniciales}")
+    print(f"   - Factor de reducción: {factor}")
+    print(f"   - Presupuesto: {presupuesto_epocas or 'sin límite'} épocas")
+    print(f"{'='*60}\n")
+    
+    candidatos = [
+        {'id': f'cfg{i}', 'config': dict(cfg), 'epocas': 0, 'map': None, 'checkpoint': None}
+        for i, cfg in enumerate(configuraciones)
+    ]
+    
+    epocas_usadas = 0
+    tiempo_inicio = time.time()
+    rondas = []
+    ronda = 0
+    objetivo = epocas_iniciales
+    
+    while candidatos:
+        objetivo = min(objetivo, epocas_max)
+        
+        # Recortar supervivientes si el presupuesto no alcanza para todos
+        if presupuesto_epocas is not None:
+            restante = presupuesto_epocas - epocas_usadas
+            if len(candidatos) == 1:
+                # El ganador usa lo que quede del presupuesto
+                objetivo = min(objetivo, candidatos[0]['epocas'] + restante)
+            coste = objetivo - candidatos[0]['epocas']
+            caben = restante // coste if coste > 0 else 0
+            if caben < 1:
+                print("⚠️  Presupuesto agotado, se detiene la búsqueda")
+                break
+            candidatos = candidatos[:caben]
+        
+        print(f"\n📊 Ronda {ronda}: {len(candidatos)} configuraciones a {objetivo} épocas")
+        
+        for cand in candidatos:
+            cfg = cand['config']
+            nuevas = objetivo - cand['epocas']
+            nombre = f"{nombre_busqueda}/{cand['id']}_r{ronda}"
+            
+            extra = {
+                'plots': False,
+                'save_period': -1,
+                'exist_ok': True,
+                'optimizer': cfg.get('optimizer', 'SGD'),
+            }
+            if cand['checkpoint'] is not None:
+                # Continuar sin repetir el warmup del learning rate
+                extra['warmup_epochs'] = 0
+            
+            results = train_yolo_model(
+                model_size=cfg.get('model_size', 'n'),
+                epochs=nuevas,
+                batch_size=cfg.get('batch_size', 16),
+                img_size=cfg.get('img_size', 640),
+                learning_rate=cfg.get('learning_rate', 0.01),
+                experiment_name=nombre,
+                pesos_iniciales=cand['checkpoint'],
+                **extra
+            )
+            
+            save_dir = RESULTS_DIR / nombre
+            cand['map'] = _map_de_resultados(results, save_dir)
+            cand['checkpoint'] = save_dir / 'weights' / 'last.pt'
+            cand['epocas'] = objetivo
+            epocas_usadas += nuevas
+            print(f"   {cand['id']} {cfg} -> mAP50-95: {cand['map']:.4f}")
+        
+        candidatos.sort(key=lambda c: c['map'], reverse=True)
+        rondas.append({
+            'ronda': ronda,
+            'epocas': objetivo,
+            'resultados': [
+                {'id': c['id'], 'config': c['config'], 'map50_95': c['map']}
+                for c in candidatos
+            ],
+        })
+        
+        if objetivo >= epocas_max:
+            break
+        
+        # Conservar la mejor fracción 1/factor
+        supervivientes = max(1, math.ceil(len(candidatos) / factor))
+        for c in candidatos[supervivientes:]:
+            print(f"   ✂️  Descartada {c['id']} (mAP50-95: {c['map']:.4f})")
+        candidatos = candidatos[:supervivientes]
+        
+        # Con un único superviviente se completa directamente hasta epocas_max
+        objetivo = epocas_max if len(candidatos) == 1 else objetivo * factor
+        ronda += 1
+    
+    if not rondas:
+        print("❌ No se completó ninguna ronda")
+        return None
+    
+    mejor = max(rondas[-1]['resultados'], key=lambda r: r['map50_95'])
+    epocas_mejor = rondas[-1]['epocas']
+    epocas_exhaustiva = len(configuraciones) * epocas_max
+    ahorro = 1 - epocas_usadas / epocas_exhaustiva
+    tiempo_total = time.time() - tiempo_inicio
+    
+    resumen = {
+        'mejor': mejor,
+        'epocas_mejor': epocas_mejor,
+        'ganador_completo': epocas_mejor >= epocas_max,
+        'rondas': rondas,
+        'epocas_usadas': epocas_usadas,
+        'epocas_busqueda_exhaustiva': epocas_exhaustiva,
+        'ahorro_computo': ahorro,
+        'tiempo_total_s': tiempo_total,
+        'tiempo_exhaustivo_estimado_s': tiempo_total / max(epocas_usadas, 1) * epocas_exhaustiva,
+    }
+    
+    resumen_path = RESULTS_DIR / nombre_busqueda / 'resumen.json'
+    resumen_path.parent.mkdir(parents=True, exist_ok=True)
+    resumen_path.write_text(json.dumps(resumen, indent=2, default=str))
+    
+    print(f"\n{'='*60}")
+    print("✅ BÚSQUEDA COMPLETADA")
+    print(f"{'='*60}")
+    print(f"🏆 Mejor configuración: {mejor['config']} (mAP50-95: {mejor['map50_95']:.4f})")
+    print(f"⏱️  Épocas usadas: {epocas_usadas} de {epocas_exhaustiva} "
+          f"(ahorro de cómputo: {ahorro*100:.1f}%)")
+    if epocas_mejor < epocas_max:
+        print(f"⚠️  El ganador solo entrenó {epocas_mejor} de {epocas_max} épocas "
+              f"(presupuesto agotado): el ahorro no compara resultados equivalentes")
+    print(f"⏱️  Tiempo: {tiempo_total/3600:.2f} h "
+          f"(exhaustiva estimada: {resumen['tiempo_exhaustivo_estimado_s']/3600:.2f} h)")
+    print(f"📁 Resumen guardado en: {resumen_path}")
+    
+    return resumen
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def _imagenes_de_split(split='train'):
+    """
+    Lista las imágenes de un split definido en data.yaml
+    """
+    import yaml
+    
+    with open(DATA_YAML) as f:
+        data = yaml.safe_load(f)
+    
+    base = Path(data.get('path', PROJECT_ROOT))
+    if not base.is_absolute():
+        base = PROJECT_ROOT / base
+    directorio = base / data[split]
+    
+    return sorted(p for p in directorio.rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+def cachear_predicciones_maestro(teacher_path, img_size=640, cache_dir=None, batch_size=8):
+    """
+    Ejecuta el modelo maestro una sola vez sobre las imágenes de entrenamiento
+    y guarda sus salidas crudas en disco (float16, una por imagen)
+    
+    Las salidas son los mapas de la cabeza de detección en las tres escalas
+    (logits de clase y distribuciones DFL de las cajas), concatenados como
+    [no, anclas]. Las imágenes se preparan igual que en el entrenamiento del
+    alumno (escalado al lado mayor + letterbox), que se lanza sin aumentos
+    geométricos para que cada ancla coincida.
+    
+    Args:
+        teacher_path: Pesos del maestro
+        img_size: Tamaño de entrada
+        cache_dir: Carpeta de la caché (por defecto results/cache_maestro/<exp>_<img_size>)
+        batch_size: Imágenes por pasada del maestro
+    
+    Returns:
+        Path: Carpeta de la caché
+    """
+    import cv2
+    import numpy as np
+    import torch
+    from ultralytics import YOLO
+    from ultralytics.data.augment import LetterBox
+    
+    from destilacion import mapas_cabeza
+    
+    teacher_path = Path(teacher_path)
+    if cache_dir is None:
+        cache_dir = RESULTS_DIR / 'cache_maestro' / f"{teacher_path.parent.parent.name}_{img_size}"
+    cache_dir = Path(cache_dir)
+    
+    meta = {'teacher': str(teacher_path.resolve()), 'mtime': teacher_path.stat().st_mtime,
+            'img_size': img_size}
+    meta_path = cache_dir / 'meta.json'
+    imagenes = _imagenes_de_split('train')
+    
+    if meta_path.exists() and json.loads(meta_path.read_text()) == meta:
+        faltantes = [p for p in imagenes if not (cache_dir / f"{p.stem}.npy").exists()]
+    else:
+        faltantes = imagenes
+    
+    if not faltantes:
+        print(f"✅ Caché del maestro al día: {cache_dir}")
+        return cache_dir
+    
+    print(f"\n🧑‍🏫 Cacheando predicciones del maestro: {len(faltantes)} imágenes")
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    device = obtener_dispositivo()
+    teacher = YOLO(str(teacher_path)).model.float().eval().to(device)
+    letterbox = LetterBox(new_shape=(img_size, img_size), auto=False, scaleup=True)
+    
+    with torch.no_grad():
+        for i in range(0, len(faltantes), batch_size):
+            lote = faltantes[i:i + batch_size]
+            imgs = [letterbox(image=cv2.imread(str(p))) for p in lote]
+            x = torch.from_numpy(np.stack(imgs)[..., ::-1].transpose(0, 3, 1, 2).copy())
+            x = x.to(device).float() / 255.0
+            
+            mapas = mapas_cabeza(teacher(x))
+            crudo = torch.cat([m.flatten(2) for m in mapas], 2)  # [B, no, anclas]
+            
+            for p, pred in zip(lote, crudo.half().cpu().numpy()):
+                np.save(cache_dir / f"{p.stem}.npy", pred)
+    
+    meta_path.write_text(json.dumps(meta))
+    print(f"✅ Caché guardada en: {cache_dir}")
+    return cache_dir
+
+def entrenar_destilacion(
+    teacher_path=RESULTS_DIR / 'exp3_medium' / 'weights' / 'best.pt',
+    student_size='n',
+    epochs=50,
+    batch_size=16,
+    img_size=640,
+    learning_rate=0.01,
+    peso_destilacion=1.0,
+    temperatura=2.0,
+    experiment_name='exp4_destilacion_n'
+):
+    """
+    Entrena un alumno pequeño destilando un maestro ya entrenado
+    
+    Args:
+        teacher_path: Pesos del maestro (p. ej. exp3_medium)
+        student_size: Tamaño del alumno ('n', 's')
+        epochs, batch_size, img_size, learning_rate: Como en train_yolo_model
+        peso_destilacion: Peso de la pérdida de destilación
+        temperatura: Temperatura para suavizar las salidas del maestro
+        experiment_name: Nombre del experimento
+    
+    Returns:
+        dict: Comparación de precisión y latencia en CPU maestro vs alumno
+              y cobertura de la destilación (lotes con y sin KD)
+    """
+    from destilacion import EntrenadorDestilacion
+    from seleccion_modelo import medir_latencia
+    
+    print(f"\n{'='*60}")
+    print(f"🧑‍🏫 Destilación: {Path(teacher_path).parent.parent.name} -> YOLOv8{student_size}")
+    print(f"{'='*60}")
+    
+    cache_dir = cachear_predicciones_maestro(teacher_path, img_size)
+    entrenador = partial(EntrenadorDestilacion, cache_dir=cache_dir,
+                         peso=peso_destilacion, temperatura=temperatura)
+    
+    # Sin aumentos geométricos ni de color: cada imagen del alumno debe
+    # coincidir con la que vio el maestro al crear la caché
+    train_yolo_model(
+        model_size=student_size,
+        epochs=epochs,
+        batch_size=batch_size,
+        img_size=img_size,
+        learning_rate=learning_rate,
+        experiment_name=experiment_name,
+        trainer=entrenador,
+        exist_ok=True,
+        mosaic=0.0,
+        close_mosaic=0,
+        mixup=0.0,
+        degrees=0.0,
+        translate=0.0,
+        scale=0.0,
+        shear=0.0,
+        perspective=0.0,
+        fliplr=0.0,
+        hsv_h=0.0,
+        hsv_s=0.0,
+        hsv_v=0.0,
+    )
+    
+    student_path = RESULTS_DIR / experiment_name / 'weights' / 'best.pt'
+    comparacion = {}
+    for rol, ruta in (('maestro', Path(teacher_path)), ('alumno', student_path)):
+        metrics = validate_model(str(ruta), experiment_name=f"{experiment_name}_val_{rol}",
+                                 img_size=img_size)
+        comparacion[rol] = {
+            'pesos': str(ruta),
+            'map50': float(metrics.box.map50),
+            'map50_95': float(metrics.box.map),
+            **medir_latencia(ruta, img_size),
+        }
+    
+    # Lotes en los que la caché del maestro se aplicó realmente
+    cobertura_path = RESULTS_DIR / experiment_name / 'cobertura_destilacion.json'
+    cobertura = json.loads(cobertura_path.read_text()) if cobertura_path.exists() else None
+    
+    (RESULTS_DIR / experiment_name / 'comparacion_destilacion.json').write_text(
+        json.dumps({**comparacion, 'cobertura_destilacion': cobertura}, indent=2)
+    )
+    
+    print(f"\n📊 Maestro vs Alumno (CPU, imgsz={img_size}):")
+    print(f"   {'':10}{'mAP50':>10}{'mAP50-95':>10}{'ms':>10}{'img/s':>10}")
+    for rol, r in comparacion.items():
+        print(f"   {rol:10}{r['map50']:>10.4f}{r['map50_95']:>10.4f}"
+              f"{r['latencia_ms']:>10.1f}{r['imagenes_por_s']:>10.1f}")
+    
+    if cobertura is None:
+        print("⚠️  Sin registro de cobertura: no se sabe si hubo destilación")
+    else:
+        total = cobertura['lotes_con_kd'] + cobertura['lotes_sin_kd']
+        aviso = "" if cobertura['lotes_sin_kd'] == 0 else f"  ⚠️  sin KD: {cobertura['motivos_sin_kd']}"
+        print(f"🧑‍🏫 Lotes con destilación: {cobertura['lotes_con_kd']} de {total} "
+              f"({cobertura['fraccion_con_kd']*100:.1f}%){aviso}")
+    
+    return {**comparacion, 'cobertura_destilacion': cobertura}
+
 if __name__ == "__main__":
     
+    if len(sys.argv) > 1 and sys.argv[1] == 'busqueda':
+        # BÚSQUEDA DE HIPERPARÁMETROS: python train.py busqueda
+        configuraciones = [
+            {'model_size': size, 'learning_rate': lr, 'batch_size': 16, 'img_size': 640}
+            for size in ['n', 's']
+            for lr in [0.02, 0.01, 0.005, 0.001]
+        ]
+        busqueda_successive_halving(
+            configuraciones,
+            epocas_iniciales=3,
+            factor=3,
+            epocas_max=50,
+            presupuesto_epocas=150,
+        )
+        sys.exit(0)
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'destilar':
+        # DESTILACIÓN: python train.py destilar (maestro exp3_medium -> alumno nano)
+        entrenar_destilacion(
+            teacher_path=RESULTS_DIR / 'exp3_medium' / 'weights' / 'best.pt',
+            student_size='n',
+            epochs=50,
+            batch_size=16,
+            img_size=640,
+            experiment_name='exp4_destilacion_n'
+        )
+        sys.exit(0)
+    
     # EXPERIMENTO 1: Modelo pequeño, configuración estándar
     print("\n" + "="*60)
     print("EXPERIMENTO 1: Configuración Base")